@@ -1,20 +1,16 @@
 import json      # For handling API data
-import smtplib   # For sending the email
-import ssl       # For a secure email connection
-from email.message import EmailMessage # For building the email
 import os
-import webbrowser  # For opening HTML files in browser
-import datetime    # For timestamping saved files
 import re
 import html as _html_module
-import markdown
-from tavily import TavilyClient  # Tavily's official Python SDK
 from dotenv import load_dotenv   # For loading .env files
-import tkinter as tk
-from tkinter import scrolledtext
 import threading
 import sys
+import atexit
+import argparse    # For the headless command-line mode
 from io import StringIO
+from metrics import metrics  # Per-stage timings and counters
+# Heavier modules (tavily, markdown, smtplib, tkinter, ...) are imported inside the
+# functions that need them, so the headless commands start quickly and never load tkinter.
 load_dotenv()
 
 # --- 1. SETTINGS: FILL THESE IN! ---
@@ -28,40 +24,271 @@ YOUR_GMAIL_APP_PASSWORD = os.environ.get('YOUR_GMAIL_APP_PASSWORD')
 if not YOUR_GMAIL_APP_PASSWORD:
     print("❌ No SMTP server key found in environment variables")
 
-# --- Helper: minimal Markdown to HTML converter (used for saved previews) ---
-def convert_markdown_to_html(md_text: str) -> str:
+# SMTP server to send through. Override SMTP_SERVER / SMTP_PORT / SMTP_USE_SSL
+# in the .env file to point at a local test server instead of Gmail.
+SMTP_SERVER = os.environ.get('SMTP_SERVER', "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 465))
+SMTP_USE_SSL = os.environ.get('SMTP_USE_SSL', '1') != '0'
+
+# Close idle SMTP connections after this many seconds (Gmail drops them after a few minutes)
+SMTP_MAX_IDLE_SECONDS = 240
+
+# Write timing metrics to this file when the program exits (or use --metrics).
+# A .prom file gets Prometheus text; any other file gets one JSON line per run.
+METRICS_FILE = os.environ.get('METRICS_FILE')
+
+# Folder saved results are written to (next to this script)
+SAVED_HTML_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_html')
+
+# Shared store of saved results, created the first time a result is saved
+result_store = None
+_result_store_lock = threading.Lock()
+
+def get_result_store():
     """
-    Minimal converter that handles headings ('# ...'), horizontal rules (---),
-    fenced code blocks (```), and inline code. Returns an HTML fragment.
+    Return the shared content-addressed store for saved results (in SAVED_HTML_FOLDER),
+    creating it on first use.
     """
-    # Extract fenced code blocks
-    code_blocks = []
+    global result_store
+    with _result_store_lock:
+        if result_store is None or result_store.root != SAVED_HTML_FOLDER:
+            from result_store import ResultStore  # Compressed, deduplicated saved pages
+            result_store = ResultStore(SAVED_HTML_FOLDER)
+        return result_store
+
+# Queue emails in a durable outbox and send them from background workers.
+# Set EMAIL_OUTBOX=0 in .env to send each email before send_email returns.
+EMAIL_OUTBOX = os.environ.get('EMAIL_OUTBOX', '1') != '0'
+OUTBOX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outbox.sqlite3')
+OUTBOX_WORKERS = 2
+
+# Shared outbox and its workers, created the first time an email is queued
+outbox = None
+outbox_workers = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """Return the shared email outbox, creating it on first use."""
+    global outbox
+    with _outbox_lock:
+        if outbox is None:
+            from mail_outbox import MailOutbox  # Durable queue of outgoing emails
+            outbox = MailOutbox(OUTBOX_FILE)
+        return outbox
+
+def start_outbox_workers():
+    """Start the background threads that send queued emails (only once)."""
+    global outbox_workers
+    box = get_outbox()
+    with _outbox_lock:
+        if outbox_workers is None:
+            from mail_outbox import OutboxWorkers
+            outbox_workers = OutboxWorkers(box, deliver_email, workers=OUTBOX_WORKERS).start()
+        return outbox_workers
+
+def flush_outbox(timeout=120):
+    """
+    Wait for queued emails to be sent (used before a headless command exits).
+    Messages waiting for a later retry stay in the outbox for the next run.
+    """
+    if outbox is None or not outbox.unfinished():
+        return True
+    print("⏳ Waiting for queued emails to be sent...")
+    done = start_outbox_workers().wait_until_empty(timeout)
+    left = outbox.unfinished()
+    if left:
+        print(f"📬 {left} email(s) will be retried later (run `outbox` to see them).")
+    return done
+
+def resume_outbox():
+    """Start the outbox workers if an earlier run left emails unsent (used by the long-running modes)."""
+    if outbox is None and not os.path.exists(OUTBOX_FILE):
+        return
+    left = get_outbox().unfinished()
+    if left:
+        print(f"📬 Sending {left} email(s) left over from an earlier run...")
+        start_outbox_workers()
+
+# Saved searches for the watchlist and fingerprints of what they already reported
+WATCHLIST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watchlist.sqlite3')
+
+def get_watchlist():
+    """Open the watchlist database."""
+    from watchlist import Watchlist  # Saved searches with change detection
+    return Watchlist(WATCHLIST_FILE)
+
+# Merge near-duplicate results (syndicated copies of one article) before showing them.
+# Set DEDUPE_RESULTS=0 in .env to show every copy.
+DEDUPE_RESULTS = os.environ.get('DEDUPE_RESULTS', '1') != '0'
+# MinHash/LSH index of every saved page, used to spot results that were saved before
+DUPLICATE_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'duplicate_index.sqlite3')
+
+# Shared near-duplicate index, created the first time it is used
+duplicate_index = None
+_duplicate_index_lock = threading.Lock()
+
+def get_duplicate_index():
+    """Return the shared near-duplicate index of saved pages, creating it on first use."""
+    global duplicate_index
+    with _duplicate_index_lock:
+        if duplicate_index is None:
+            from near_duplicates import DuplicateIndex  # MinHash + LSH
+            duplicate_index = DuplicateIndex(DUPLICATE_INDEX_FILE)
+            atexit.register(duplicate_index.close)
+        return duplicate_index
+
+def dedupe_results(results):
+    """
+    Collapse near-duplicate results into one entry with 'alternate_urls', and
+    mark results that match an already saved page with 'duplicate_of'.
+    Returns the results unchanged when DEDUPE_RESULTS is off.
+    """
+    if not DEDUPE_RESULTS or not results:
+        return results
+    from near_duplicates import collapse_duplicates
+    with metrics.timer('dedupe'):
+        kept = collapse_duplicates(results, get_duplicate_index())
+    merged = len(results) - len(kept)
+    if merged:
+        metrics.inc('duplicates_merged', merged)
+        print(f"♻️ Merged {merged} near-duplicate result(s).")
+    return kept
+
+def mark_saved_duplicate(result):
+    """
+    Set 'duplicate_of' on a result whose page body matches an already saved page.
+    Used once a lazily fetched body arrives: dedupe_results only had the
+    snippet to go on, while saved pages are indexed by their full bodies.
+    """
+    content = result.get('raw_content')
+    if not DEDUPE_RESULTS or result.get('duplicate_of') or not isinstance(content, str) or not content:
+        return result
+    from spill import SPILL_THRESHOLD_CHARS
+    from text_fingerprint import minhash
+    # Same cut as save_to_html uses when it indexes a page
+    saved = get_duplicate_index().find(minhash(content[:SPILL_THRESHOLD_CHARS]))
+    return dict(result, duplicate_of=saved[0]) if saved else result
+
+# Full-text index of saved results (next to this script)
+RESULT_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_index.sqlite3')
+
+# Shared index of saved results, created the first time it is used
+result_index = None
+_result_index_lock = threading.Lock()
 
-    def _code_block_repl(m):
-        code_blocks.append(m.group(1))
-        return f"@@CODEBLOCK{len(code_blocks)-1}@@"
+def get_result_index():
+    """Return the shared index of saved results, creating it on first use."""
+    global result_index
+    with _result_index_lock:
+        if result_index is None:
+            from result_index import ResultIndex  # SQLite FTS5 index of saved results
+            result_index = ResultIndex(RESULT_INDEX_FILE)
+            atexit.register(result_index.close)
+        return result_index
 
-    text = re.sub(r"```\n?(.*?)\n?```", _code_block_repl, md_text, flags=re.DOTALL)
+def lookup_saved(text, limit=10):
+    """
+    Print saved results matching `text` ("have we seen this before?").
+    A URL is looked up exactly; anything else is a full-text search.
+    Returns the list of matches.
+    """
+    index = get_result_index()
+    if text.startswith(('http://', 'https://')):
+        matches = index.find_url(text)
+    else:
+        matches = index.search(text, limit=limit)
+    if not matches:
+        print(f"🔎 Nothing saved matches '{text}'.")
+        return matches
+    print(f"🔎 {len(matches)} saved result(s) match '{text}':")
+    for i, match in enumerate(matches, 1):
+        print(f"\n{i:>3}. 📌 {match['title']}")
+        print(f"     🔗 {match['url']}")
+        # Older index entries hold the path of a page; newer ones a save id to open
+        if os.path.exists(match['path']):
+            print(f"     💾 {match['path']} ({match['saved_at']})")
+        else:
+            print(f"     💾 Saved as {match['path']} ({match['saved_at']}) - "
+                  f"open it with: python TavilySSS.py open {match['path']}")
+        if match['snippet']:
+            print(f"     {' '.join(match['snippet'].split())}")
+    return matches
+
+# Shared pool of SMTP connections, created the first time an email is sent
+smtp_pool = None
+_smtp_pool_lock = threading.Lock()
+
+def get_smtp_pool():
+    """Return the shared SMTP connection pool, creating it on first use."""
+    global smtp_pool
+    with _smtp_pool_lock:
+        if smtp_pool is None:
+            from smtp_pool import SMTPPool  # Reusable logged-in SMTP connections
+            smtp_pool = SMTPPool(
+                SMTP_SERVER,
+                SMTP_PORT,
+                username=YOUR_GMAIL_EMAIL,
+                password=YOUR_GMAIL_APP_PASSWORD,
+                use_ssl=SMTP_USE_SSL,
+                max_idle=SMTP_MAX_IDLE_SECONDS,
+            )
+            atexit.register(smtp_pool.close)
+        return smtp_pool
+
+# --- Helper: minimal Markdown to HTML converter (used for saved previews) ---
 
-    # Escape remaining text
-    escaped = _html_module.escape(text)
+# One token is either an inline code span or a line break (the same breaks str.splitlines() uses)
+_MD_TOKEN_RE = re.compile(r"`([^`]+)`|\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+_CODEBLOCK_PLACEHOLDER_RE = re.compile(r"@@CODEBLOCK(\d+)@@")
 
-    # Handle inline code
-    inline_codes = []
-    def _inline_repl(m):
-        inline_codes.append(m.group(1))
-        return f"@@INLINE{len(inline_codes)-1}@@"
+def convert_markdown_to_html(md_text: str) -> str:
+    """
+    Minimal converter that handles headings ('# ...'), horizontal rules (---),
+    fenced code blocks (```), and inline code. Returns an HTML fragment.
 
-    escaped = re.sub(r"`([^`]+?)`", _inline_repl, escaped)
+    Runs in linear time: fenced code blocks are found with one forward scan,
+    then inline code and line breaks are handled in a single tokenizing pass.
+    """
+    escape = _html_module.escape
+
+    # Pass 1: extract fenced code blocks, leaving a placeholder where each one was
+    code_blocks = []
+    pieces = []
+    pos = 0
+    while True:
+        start = md_text.find("```", pos)
+        if start == -1:
+            break
+        body_start = start + 3
+        if md_text.startswith("\n", body_start):
+            body_start += 1
+        end = md_text.find("```", body_start)
+        if end == -1:
+            # No closing fence, so no later fence can be closed either
+            break
+        # A single newline right before the closing fence is not part of the code
+        body_end = end - 1 if end > body_start and md_text[end - 1] == "\n" else end
+        pieces.append(md_text[pos:start])
+        pieces.append(f"@@CODEBLOCK{len(code_blocks)}@@")
+        code_blocks.append(md_text[body_start:body_end])
+        pos = end + 3
+    pieces.append(md_text[pos:])
+    text = "".join(pieces)
 
-    # Convert lines
+    # Pass 2: walk the text once, building each line twice - `plain` keeps inline
+    # code as placeholders (used to spot headings and rules) and `rich` has the
+    # rendered <code> tags (used for paragraphs)
     out_lines = []
-    for line in escaped.splitlines():
+    plain = []
+    rich = []
+    inline_count = 0
+
+    def _finish_line():
+        line = "".join(plain)
         if line.startswith('@@CODEBLOCK'):
-            m = re.match(r"@@CODEBLOCK(\d+)@@", line)
+            m = _CODEBLOCK_PLACEHOLDER_RE.match(line)
             if m:
-                idx = int(m.group(1))
-                code = _html_module.escape(code_blocks[idx])
+                code = escape(code_blocks[int(m.group(1))])
                 out_lines.append(f"<pre><code>{code}</code></pre>")
             else:
                 out_lines.append(line)
@@ -76,371 +303,565 @@ def convert_markdown_to_html(md_text: str) -> str:
         elif line.strip() == '':
             out_lines.append('')
         else:
-            # Restore inline code placeholders
-            restored = line
-            for i, code in enumerate(inline_codes):
-                restored = restored.replace(f"@@INLINE{i}@@", f"<code>{_html_module.escape(code)}</code>")
-            out_lines.append(f"<p>{restored}</p>")
+            out_lines.append(f"<p>{''.join(rich)}</p>")
+
+    last = 0
+    for m in _MD_TOKEN_RE.finditer(text):
+        chunk = escape(text[last:m.start()])
+        plain.append(chunk)
+        rich.append(chunk)
+        last = m.end()
+        code = m.group(1)
+        if code is not None:
+            plain.append(f"@@INLINE{inline_count}@@")
+            # Inline code is escaped along with the text and then again when rendered
+            rich.append(f"<code>{escape(escape(code))}</code>")
+            inline_count += 1
+        else:
+            _finish_line()
+            plain = []
+            rich = []
+
+    # Whatever follows the last line break is a final line (if it isn't empty)
+    tail = escape(text[last:])
+    plain.append(tail)
+    rich.append(tail)
+    if any(plain):
+        _finish_line()
 
     return "\n".join(out_lines)
 
-# --- 2. GUI CLASS FOR SEARCH INTERFACE ---
-class SearchGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("TavilySSS")
-        self.root.geometry("700x700")
-        self.root.resizable(True, True)
-        
-        # Store user input from the entry field
-        self.user_input = None
-        self.input_event = threading.Event()
-        
-        # --- Title field at top ---
-        title_frame = tk.Frame(root, bg="#007acc", height=50)
-        title_frame.pack(fill=tk.X)
-        title_label = tk.Label(
-            title_frame,
-            text="Tavily Search, Save, Send",
-            font=("Arial", 18, "bold"),
-            bg="#007acc",
-            fg="white",
-            pady=10
-        )
-        title_label.pack()
-        
-        # --- Scrolling text display in middle ---
-        self.text_display = scrolledtext.ScrolledText(
-            root,
-            wrap=tk.WORD,
-            font=("Courier", 9),
-            bg="#6e6e6e",
-            fg="#111"
-        )
-        self.text_display.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        self.text_display.config(state=tk.DISABLED)
-        
-        # --- Input frame at bottom ---
-        input_frame = tk.Frame(root)
-        input_frame.pack(fill=tk.X, padx=10, pady=10)
-        
-        self.input_field = tk.Entry(input_frame, font=("Arial", 10))
-        self.input_field.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
-        self.input_field.bind("<Return>", lambda e: self.submit_input())
-        
-        submit_button = tk.Button(
-            input_frame,
-            text="Enter",
-            font=("Arial", 10),
-            bg="#007acc",
-            fg="white",
-            command=self.submit_input,
-            width=8
-        )
-        submit_button.pack(side=tk.RIGHT)
-    
-    def append_text(self, text):
-        """Append text to the scrolled text display."""
-        self.text_display.config(state=tk.NORMAL)
-        self.text_display.insert(tk.END, text)
-        self.text_display.see(tk.END)
-        self.text_display.config(state=tk.DISABLED)
-        self.root.update()
-    
-    def submit_input(self):
-        """Called when user clicks Enter button or presses Return key."""
-        self.user_input = self.input_field.get()
-        self.input_field.delete(0, tk.END)
-        self.input_event.set()
-    
-    def get_input(self, prompt=""):
-        """Replaces the built-in input() function."""
-        self.append_text(prompt)
-        self.input_event.clear()
-        self.user_input = None
-        
-        # Wait for user to submit input
-        while not self.user_input:
-            self.root.update()
-            self.input_event.wait(timeout=0.1)
-        
-        result = self.user_input
-        self.append_text(result + "\n")
-        return result
+def render_markdown(text):
+    """
+    Render Markdown text to an HTML fragment with the shared, memoized renderer.
+    The `markdown` package is only imported the first time this runs.
+    """
+    from markdown_render import render_markdown as _render_markdown
+    with metrics.timer('render'):
+        return _render_markdown(text)
 
-# --- Redirect print() and input() to GUI ---
-gui_instance = None
 
-def setup_gui_redirection(gui):
-    """Redirect print and input to GUI."""
-    global gui_instance
-    gui_instance = gui
-    
-    # Redirect input() calls
-    import builtins
-    original_input = builtins.input
-    
-    def gui_input(prompt=""):
-        if gui_instance:
-            return gui_instance.get_input(prompt)
-        else:
-            return original_input(prompt)
-    
-    builtins.input = gui_input
-    
-    # Redirect print() to GUI
-    original_stdout = sys.stdout
-    
-    class GUIStdout:
-        def __init__(self):
-            self.buffer = ""
-        
-        def write(self, text):
-            if gui_instance:
-                gui_instance.append_text(text)
-            else:
-                original_stdout.write(text)
-            return len(text)
-        
-        def flush(self):
-            pass
-    
-    sys.stdout = GUIStdout()
+def render_if_small(content):
+    """
+    Render `content` now so the HTML can be shared by the saved page and the
+    email - unless it is a large body spilled to disk (see spill.py), which
+    save_to_html renders in pieces instead. Returns None in that case.
+    """
+    return render_markdown(content) if isinstance(content, str) else None
 
 
-def send_email(subject, body, to_email):
+def build_email(subject, body, to_email, html_body=None):
     """
-    Connects to Gmail and sends the email.
+    Build the email message: plain-text body plus an HTML version.
+    Pass `html_body` to reuse HTML that was already rendered from `body`.
     """
-    print(f"📤 Connecting to Gmail to send email to {to_email}...")
+    from email.message import EmailMessage # For building the email
     # Create the email message object
     msg = EmailMessage()
     msg['Subject'] = subject
     msg['From'] = YOUR_GMAIL_EMAIL
     msg['To'] = to_email
+    # An email has to be built in memory, so a page body spilled to disk is read back here
+    body = str(body)
     # Set the plain-text fallback
     msg.set_content(body)
-    # Add HTML alternative for rich formatting using the `markdown` package
-    # Enable common useful extensions for fenced code blocks, tables, and code highlighting
-    try:
-        html_body = markdown.markdown(body or "", extensions=["fenced_code", "tables", "codehilite"])
-    except Exception:
-        # Fallback to escaping the body inside a <pre> block
-        html_body = f"<pre>{_html_module.escape(body or '')}</pre>"
+    # Add HTML alternative for rich formatting using the shared Markdown renderer
+    if html_body is None:
+        html_body = render_markdown(body)
     msg.add_alternative(html_body, subtype='html')
-    # Create a secure SSL context
-    context = ssl.create_default_context()
+    return msg
+
+
+def deliver_email(msg, pool=None):
+    """
+    Send a built message right now over the shared SMTP pool (or `pool` if given).
+    Raises on failure - used by the outbox workers, which retry.
+    """
+    # Send over a pooled connection (opens and logs in to Gmail only if needed)
+    (pool or get_smtp_pool()).send_message(msg)
+    metrics.inc('emails_sent')
+
+
+def send_email(subject, body, to_email, pool=None, html_body=None, queue=None):
+    """
+    Connects to Gmail and sends the email.
+    Connections are reused from the shared SMTP pool (or `pool` if given),
+    so sending several emails in a row only logs in once.
+    Pass `html_body` to reuse HTML that was already rendered from `body`.
+    
+    When the outbox is on (EMAIL_OUTBOX, or `queue=True`) the message is saved
+    to the outbox and this returns right away; background workers send it and
+    retry on failure. Otherwise it is sent before returning.
+    """
+    import smtplib   # For sending the email
+    msg = build_email(subject, body, to_email, html_body=html_body)
+    
+    if EMAIL_OUTBOX if queue is None else queue:
+        try:
+            message_id, _ = get_outbox().enqueue(msg)
+            start_outbox_workers()
+        except Exception as e:
+            metrics.inc('smtp_errors')
+            print(f"❌ Error queueing email: {e}")
+            return
+        print(f"📬 Email to {to_email} queued (id {message_id[:12]}); it will be sent in the background.")
+        return
+    
+    print(f"📤 Connecting to Gmail to send email to {to_email}...")
     try:
-        # Connect to Gmail's SMTP server over SSL (Port 465)
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(YOUR_GMAIL_EMAIL, YOUR_GMAIL_APP_PASSWORD)
-            print("✅ Logged in to Gmail.")
-            server.send_message(msg)
-            print(f"🎉 Email sent successfully to {to_email}!")
+        deliver_email(msg, pool)
+        print(f"🎉 Email sent successfully to {to_email}!")
     except smtplib.SMTPAuthenticationError:
+        metrics.inc('smtp_errors')
         print("\n❌ CRITICAL ERROR: Gmail login failed.")
         print("   Please check:")
         print("   1. YOUR_GMAIL_EMAIL is correct.")
         print("   2. YOUR_GMAIL_APP_PASSWORD is the 16-character code (not your regular password).")
     except Exception as e:
+        metrics.inc('smtp_errors')
         print(f"❌ Error sending email: {e}")
-def save_to_html(content, title, url):
+def send_digest(results, recipients, subject, pool=None, queue=None, bcc=False):
+    """
+    Email several results as one digest to many recipients.
+
+    The MIME message is rendered once and sent over a single SMTP session with
+    one RCPT TO per recipient. Very long pages are shortened in the body and
+    attached gzipped, and a digest too big for one email is split into parts.
+
+    Args:
+        results (list): Search result dicts
+        recipients (list): Email addresses
+        subject (str): Subject line
+        pool (SMTPPool): Pool to send through (defaults to the shared pool)
+        queue (bool): Use the outbox (defaults to EMAIL_OUTBOX)
+        bcc (bool): Hide the recipients from each other
+
+    Returns (sent, failed): how many digest emails were sent or queued, and how many could not be.
+    """
+    import smtplib   # For sending the email
+    from email_digest import build_digest_messages  # Digest layout and size-aware splitting
+    if not results or not recipients:
+        print("❌ Nothing to send: a digest needs at least one result and one recipient.")
+        return 0, 0
+    messages = build_digest_messages(results, recipients, subject, YOUR_GMAIL_EMAIL,
+                                     render_markdown, bcc=bcc)
+    who = ", ".join(recipients)
+    sent = 0
+    failed = 0
+    for msg in messages:
+        if EMAIL_OUTBOX if queue is None else queue:
+            try:
+                message_id, _ = get_outbox().enqueue(msg)
+                start_outbox_workers()
+            except Exception as e:
+                metrics.inc('smtp_errors')
+                print(f"❌ Error queueing digest: {e}")
+                failed += 1
+                continue
+            print(f"📬 Digest '{msg['Subject']}' for {who} queued (id {message_id[:12]}).")
+            sent += 1
+            continue
+        print(f"📤 Sending digest '{msg['Subject']}' to {who}...")
+        try:
+            deliver_email(msg, pool)
+            print(f"🎉 Digest sent to {len(recipients)} recipient(s)!")
+            sent += 1
+        except smtplib.SMTPAuthenticationError:
+            metrics.inc('smtp_errors')
+            failed += 1
+            print("\n❌ CRITICAL ERROR: Gmail login failed.")
+        except Exception as e:
+            metrics.inc('smtp_errors')
+            failed += 1
+            print(f"❌ Error sending digest: {e}")
+    return sent, failed
+
+def save_to_html(content, title, url, body_fragment=None, open_browser=True, query=None):
     """
-    Save search result to an HTML file in the saved_html folder and open it.
+    Save search result to the saved_html folder and open it.
+    The rendered page is stored compressed and only once per unique body
+    (see result_store.py). Returns the save id (None on failure); its
+    readable HTML view is written when it is opened (see saved_view).
+    The result is also added to the search index so it can be found again offline.
     
     Args:
-        content (str): The full content to save
+        content (str or SpilledText): The full content to save
         title (str): The title of the result
         url (str): The source URL of the result
+        body_fragment (str): HTML already rendered from `content` (optional)
+        open_browser (bool): Open the saved file in the default browser
+        query (str): The search query that found this result (optional)
     """
     try:
-        # Get the directory where gmail.py is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        saved_folder = os.path.join(script_dir, 'saved_html')
-        
-        # Create the folder if it doesn't exist
-        os.makedirs(saved_folder, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"result_{timestamp}.html"
-        filepath = os.path.join(saved_folder, filename)
-        
         # Convert Markdown-like content to HTML fragment so headings
         # (lines starting with #) and fenced code blocks render properly.
-        try:
-            # Use the `markdown` library to convert the content to HTML
-            body_fragment = markdown.markdown(content or "", extensions=["fenced_code", "tables", "codehilite"])
-        except Exception:
-            # Fallback: escape the content and preserve line breaks
-            body_fragment = f"<pre>{_html_module.escape(content)}</pre>"
-
-        # Create formatted HTML document
-        html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-            color: #111;
-            line-height: 1.6;
-            padding: 20px;
-            max-width: 900px;
-            margin: 0 auto;
-            background: #f5f5f5;
-        }}
-        .container {{
-            background: white;
-            padding: 30px;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #222;
-            margin-top: 0;
-            border-bottom: 3px solid #007acc;
-            padding-bottom: 10px;
-        }}
-        .metadata {{
-            background: #f0f4f8;
-            padding: 15px;
-            border-radius: 4px;
-            margin: 20px 0;
-            border-left: 4px solid #007acc;
-        }}
-        .metadata p {{
-            margin: 5px 0;
-        }}
-        .metadata strong {{
-            color: #007acc;
-        }}
-        .source-url {{
-            word-break: break-all;
-            font-family: 'Courier New', monospace;
-            font-size: 12px;
-        }}
-        .content {{
-            margin-top: 30px;
-            line-height: 1.8;
-            word-break: break-word;
-            overflow-wrap: anywhere;
-            white-space: pre-line;
-            max-width: 100%;
-        }}
-        .timestamp {{
-            text-align: right;
-            color: #999;
-            font-size: 12px;
-            margin-top: 40px;
-            border-top: 1px solid #eee;
-            padding-top: 10px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>{title}</h1>
-        <div class="metadata">
-            <p><strong>Source URL:</strong></p>
-            <p class="source-url"><a href="{url}" target="_blank">{url}</a></p>
-            <p><strong>Content Length:</strong> {len(content)} characters</p>
-        </div>
-        <div class="content">
-    {body_fragment}
-        </div>
-        <div class="timestamp">
-            Saved on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        </div>
-    </div>
-</body>
-</html>"""
+        # A very large body is rendered and written piece by piece so it never sits in memory whole.
+        from spill import SPILL_THRESHOLD_CHARS, SpilledText, iter_text
+        if body_fragment is None and len(content) > SPILL_THRESHOLD_CHARS:
+            from markdown_render import render_markdown_stream
+            body_fragment = render_markdown_stream(iter_text(content))
+        elif body_fragment is None:
+            body_fragment = render_markdown(content)
         
-        # Write to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # Store the body once (compressed, keyed by its hash) and record this save
+        store = get_result_store()
+        with metrics.timer('save_write'):
+            record = store.save(body_fragment, title, url, len(content))
+        metrics.inc('save_bytes', record['bytes_written'])
+        
+        if record['bytes_written']:
+            print(f"\n✅ Result saved as {record['id']}")
+        else:
+            metrics.inc('save_duplicates')
+            print(f"\n✅ Result saved as {record['id']} (same page was already stored)")
         
-        print(f"\n✅ File saved to: {filepath}")
+        # Add it to the indexes under its save id (a failure here shouldn't lose the saved result).
+        # Saves of the same body share one view file, so the view is only written when opened.
+        # Only the start of a spilled body is indexed, to keep memory bounded.
+        if isinstance(content, SpilledText):
+            content = content.head(SPILL_THRESHOLD_CHARS)
+        try:
+            with metrics.timer('index_add'):
+                get_result_index().add(record['id'], title, url, content, query=query)
+                if DEDUPE_RESULTS:
+                    from text_fingerprint import minhash
+                    get_duplicate_index().add(minhash(content), url, title)
+        except Exception as e:
+            print(f"⚠️ Could not add the result to the search index: {e}")
         
-        # Open the file in the default browser
-        webbrowser.open('file://' + filepath)
-        print(f"🌐 Opening file in browser...")
+        # Write a readable HTML page and open it in the default browser
+        if open_browser:
+            open_in_browser(store.write_view(record))
 
-        return filepath
+        return record['id']
     except Exception as e:
+        metrics.inc('save_errors')
         print(f"❌ Error saving file: {str(e)}")
         return None
 
+def open_in_browser(filepath):
+    """Open a saved HTML page in the default browser."""
+    import webbrowser  # For opening HTML files in browser
+    print(f"🌐 Opening {filepath} in browser...")
+    webbrowser.open('file://' + os.path.abspath(filepath))
+
+def saved_view(path_or_id):
+    """
+    Return the path of a readable HTML page for a saved result, writing it
+    from the store if needed. Accepts a save id (what the index holds), a body
+    hash, or the path of a page from an older index.
+    Returns None if nothing matches.
+    """
+    save_id = os.path.splitext(os.path.basename(path_or_id))[0]
+    path = get_result_store().ensure_view(save_id)
+    if path is None and os.path.exists(path_or_id):
+        return path_or_id
+    return path
+
+# Pace of Tavily calls (steady calls per second plus a burst allowance); see rate_limit.py
+TAVILY_RATE_PER_SECOND = float(os.environ.get('TAVILY_RATE_PER_SECOND', 2))
+TAVILY_BURST = int(os.environ.get('TAVILY_BURST', 5))
+# Credits in your Tavily plan per month (0 = don't warn); usage is counted per key and month
+TAVILY_MONTHLY_CREDITS = int(os.environ.get('TAVILY_MONTHLY_CREDITS', 0))
+API_USAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_usage.sqlite3')
+
+# Shared usage tracker, created with the Tavily client
+api_usage = None
+_api_usage_lock = threading.Lock()
+
+def get_api_usage():
+    """Return the shared UsageTracker for Tavily calls, creating it on first use."""
+    global api_usage
+    with _api_usage_lock:
+        if api_usage is None:
+            from rate_limit import UsageTracker  # Calls and credits per key and month
+            api_usage = UsageTracker(API_USAGE_FILE, monthly_credits=TAVILY_MONTHLY_CREDITS)
+            atexit.register(api_usage.close)
+        return api_usage
+
+# Shared Tavily client, created the first time a search runs
+tavily_client = None
+_tavily_client_lock = threading.Lock()
+
+def get_tavily_client():
+    """
+    Return the shared Tavily client, creating it on first use.
+    It is a TavilyClient wrapped in a ThrottledClient, so identical searches
+    running at the same time share one API call, calls are paced to the
+    plan's limits and 429/5xx errors are retried with backoff.
+    Returns None if no TAVILY_API_KEY is set.
+    """
+    global tavily_client
+    with _tavily_client_lock:
+        if tavily_client is None:
+            api_key = os.environ.get('TAVILY_API_KEY')
+            if not api_key:
+                return None
+            from tavily import TavilyClient  # Tavily's official Python SDK
+            from rate_limit import ThrottledClient, TokenBucket  # Coalescing, pacing and retries
+            tavily_client = ThrottledClient(
+                TavilyClient(api_key=api_key),
+                bucket=TokenBucket(TAVILY_RATE_PER_SECOND, TAVILY_BURST),
+                usage=get_api_usage(),
+                api_key=api_key,
+            )
+        return tavily_client
+
+# Search response cache settings. Set SEARCH_CACHE_TTL_SECONDS=0 in .env to turn it off.
+SEARCH_CACHE_TTL_SECONDS = float(os.environ.get('SEARCH_CACHE_TTL_SECONDS', 6 * 60 * 60))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 500))
+
+# Shared search cache, created the first time a search runs
+search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache():
+    """
+    Return the shared search response cache, creating it on first use.
+    Returns None if caching is turned off.
+    """
+    global search_cache
+    if SEARCH_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _search_cache_lock:
+        if search_cache is None:
+            from search_cache import SearchCache  # On-disk cache of search responses
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            search_cache = SearchCache(
+                os.path.join(script_dir, 'search_cache.sqlite3'),
+                ttl=SEARCH_CACHE_TTL_SECONDS,
+                max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            )
+            atexit.register(search_cache.close)
+        return search_cache
+
+# Shared cache of pages fetched through the extract endpoint (same TTL as searches)
+extract_cache = None
+
+def get_extract_cache():
+    """
+    Return the shared on-disk cache of extracted page bodies, creating it on first use.
+    Returns None if caching is turned off.
+    """
+    global extract_cache
+    if SEARCH_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _search_cache_lock:
+        if extract_cache is None:
+            from search_cache import SearchCache
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            extract_cache = SearchCache(
+                os.path.join(script_dir, 'extract_cache.sqlite3'),
+                ttl=SEARCH_CACHE_TTL_SECONDS,
+                max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            )
+            atexit.register(extract_cache.close)
+        return extract_cache
+
+# Every search's results are appended to a compressed JSON Lines archive for analysis
+# (see result_export.py). Set EXPORT_RESULTS=0 in .env to turn it off.
+EXPORT_RESULTS = os.environ.get('EXPORT_RESULTS', '1') != '0'
+EXPORT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+
+# Shared exporter, created the first time results are exported
+result_exporter = None
+_result_exporter_lock = threading.Lock()
+
+def get_result_exporter():
+    """Return the shared ResultExporter (a new one if EXPORT_FOLDER changed)."""
+    global result_exporter
+    with _result_exporter_lock:
+        if result_exporter is None or result_exporter.folder != EXPORT_FOLDER:
+            from result_export import ResultExporter  # Append-only JSONL.gz archive
+            result_exporter = ResultExporter(EXPORT_FOLDER)
+        return result_exporter
+
+# Search first without page bodies and fetch them only for the results that are used
+# (through Tavily's extract endpoint). Set LAZY_RAW_CONTENT=0 in .env to always get them.
+LAZY_RAW_CONTENT = os.environ.get('LAZY_RAW_CONTENT', '1') != '0'
+
+# Shared on-demand content fetcher, created the first time it is needed
+content_fetcher = None
+_content_fetcher_lock = threading.Lock()
+
+def get_content_fetcher(client=None):
+    """Return the shared ContentFetcher (a new one if the Tavily client changed)."""
+    global content_fetcher
+    client = client or get_tavily_client()
+    with _content_fetcher_lock:
+        if content_fetcher is None or content_fetcher.client is not client:
+            from content_fetch import ContentFetcher  # Batched calls to the extract endpoint
+            if content_fetcher is not None:
+                content_fetcher.close()
+            content_fetcher = ContentFetcher(client, cache=get_extract_cache())
+        return content_fetcher
+
+def tavily_search(query, max_results=5, client=None, use_cache=True, refresh=False, include_raw_content=True):
+    """
+    Make the API call to Tavily's search endpoint and return the response dict.
+    Responses are cached on disk so repeating a query does not cost another API call;
+    a response taken from the cache has 'from_cache' set to True.
+
+    Args:
+        query (str): The search query
+        max_results (int): Most results to return
+        client (TavilyClient): Client to use (defaults to the shared client)
+        use_cache (bool): Set to False to skip the cache completely
+        refresh (bool): Set to True to ignore a cached response and fetch a new one
+        include_raw_content (bool): Set to False for titles, URLs, snippets and
+            scores only (fetch page bodies later with get_content_fetcher())
+    """
+    # search_depth="advanced" gives us more comprehensive results
+    # include_raw_content=True ensures we get full content, not summaries
+    params = {
+        'max_results': max_results,
+        'search_depth': "advanced",  # Can be "basic" or "advanced"
+        'include_raw_content': include_raw_content,  # Get full page content
+    }
+    cache = get_search_cache() if use_cache else None
+    if cache is not None and not refresh:
+        cached = cache.get(query, **params)
+        if cached is not None:
+            metrics.inc('search_cache_hits')
+            cached['from_cache'] = True
+            return cached
+        metrics.inc('search_cache_misses')
+
+    client = client or get_tavily_client()
+    if client is None:
+        raise RuntimeError("No TAVILY_API_KEY found in environment variables")
+    with metrics.timer('tavily_api'):
+        response = client.search(query=query, **params)
+    metrics.inc('tavily_raw_content_bytes',
+                sum(len(r.get('raw_content') or '') for r in response.get('results', [])))
+
+    # Archive what the API returned (cached repeats are not exported twice)
+    if EXPORT_RESULTS:
+        try:
+            with metrics.timer('export'):
+                get_result_exporter().append(query, response.get('results', []))
+        except Exception as e:
+            print(f"⚠️ Could not export the results: {e}")
+
+    if cache is not None:
+        cache.set(query, response, **params)
+    return response
+
+def print_result(i, result, show_content=True):
+    """
+    Print one search result and return its full content.
+
+    Args:
+        i (int): Position of the result (starting from 1)
+        result (dict): One entry from the response's 'results' list
+        show_content (bool): Print the full page content as well as the summary
+    """
+    # Each result is a dictionary with keys like 'title', 'url', 'content'
+    print(f"\n{'='*70}")
+    print(f"Result #{i}")
+    print(f"{'='*70}")
+    print(f"📌 Title: {result['title']}")
+    print(f"🔗 URL: {result['url']}")
+    
+    # Show relevance score (if available)
+    print(f"⭐ Relevance Score: {result.get('score', 'N/A')}")
+    
+    # Other sites carrying the same article (merged by dedupe_results)
+    for alternate in result.get('alternate_urls', []):
+        print(f"🔁 Also at: {alternate}")
+    if result.get('duplicate_of'):
+        saved = result['duplicate_of']
+        print(f"♻️ Already saved as: {saved['title']} ({saved['url']}, {saved['similarity']:.0%} similar)")
+    
+    # Display FULL content - try raw_content first, then content
+    # (raw_content is a SpilledText when a large body was moved to disk)
+    full_content = result.get('raw_content', '') or result.get('content', '')
+    content_length = len(full_content)
+    print(f"📊 Content Length: {content_length} characters")
+    
+    if show_content:
+        print(f"\n📄 Full Content:")
+        print(f"{'-'*70}")
+        # Print the complete content without truncation (a piece at a time if it was spilled to disk)
+        from spill import iter_text
+        for piece in iter_text(full_content):
+            print(piece, end='')
+        print()
+        print(f"{'-'*70}")
+        print()  # Extra blank line for readability
+    
+    # Debug: Show what keys are available in the result
+    print(f"🔍 Available data fields: {', '.join(result.keys())}")
+    print()
+    return full_content
+
 def search_agent(query, max_results=5):
    
     # Initialize Tavily client
-    api_key = os.environ.get('TAVILY_API_KEY')
-    if not api_key:
+    client = get_tavily_client()
+    if client is None:
         print("❌ No TAVILY_API_KEY found in environment variables")
         return None
     
-    client = TavilyClient(api_key=api_key)
-    
     # Print a header with emoji for user-friendly output
     print(f"\n🔍 SEARCH AGENT: Searching for '{query}'...\n")
     
     try:
         # Make the API call to Tavily's search endpoint
-        # search_depth="advanced" gives us more comprehensive results
-        # include_raw_content=True ensures we get full content, not summaries
-        response = client.search(
-            query=query,
-            max_results=max_results,
-            search_depth="advanced",  # Can be "basic" or "advanced"
-            include_raw_content=True  # Get full page content
-        )
+        # (in lazy mode only the summaries come back; page bodies are fetched below)
+        response = tavily_search(query, max_results=max_results, client=client,
+                                 include_raw_content=not LAZY_RAW_CONTENT)
     
-        # Extract the results list from the response dictionary
-        # .get() is safer than [] - returns None if key doesn't exist
-        results = response.get('results', [])
+        # Take the results list out of the response dictionary so the results
+        # can be handled one at a time and let go of afterwards
+        results = dedupe_results(response.pop('results', []))
+        # The returned response keeps each result's title, URL, score and snippet
+        # for further processing, but not the page bodies
+        response['results'] = [{key: result.get(key) for key in ('title', 'url', 'score', 'content')}
+                               for result in results]
         
         # Display count of results found
         print(f"Found {len(results)} results:\n")
         
+        fetcher = get_content_fetcher(client) if LAZY_RAW_CONTENT else None
+        if fetcher and results:
+            # Start downloading the first page while the list is printed
+            fetcher.prefetch([results[0]['url']])
+        urls = [result['url'] for result in results]
+        
         # Iterate through results with enumerate
         # enumerate(list, 1) starts counting from 1 instead of 0
-        for i, result in enumerate(results, 1):
-            # Each result is a dictionary with keys like 'title', 'url', 'content'
-            print(f"\n{'='*70}")
-            print(f"Result #{i}")
-            print(f"{'='*70}")
-            print(f"📌 Title: {result['title']}")
-            print(f"🔗 URL: {result['url']}")
-            
-            # Show relevance score (if available)
-            print(f"⭐ Relevance Score: {result.get('score', 'N/A')}")
-            
-            # Display FULL content - try raw_content first, then content
-            full_content = result.get('raw_content', '') or result.get('content', '')
-            content_length = len(full_content)
-            print(f"📊 Content Length: {content_length} characters")
-            
-            print(f"\n📄 Full Content:")
-            print(f"{'-'*70}")
-            # Print the complete content without truncation
-            print(full_content)
-            print(f"{'-'*70}")
-            print()  # Extra blank line for readability
-            
-            # Debug: Show what keys are available in the result
-            print(f"🔍 Available data fields: {', '.join(result.keys())}")
-            print()
+        # stream_results hands them out one by one, moving very large bodies to temp files
+        from spill import stream_results
+        for i, result in enumerate(stream_results(results), 1):
+            if fetcher:
+                filled = fetcher.fill([result])[0]
+                if EXPORT_RESULTS and not response.get('from_cache') and not result.get('raw_content'):
+                    # The search was archived without bodies, so add this one now
+                    # (a cached repeat was archived the first time round)
+                    try:
+                        get_result_exporter().append_body(query, i, filled)
+                    except Exception as e:
+                        print(f"⚠️ Could not export the page content: {e}")
+                # The saved pages can only be compared against once the body is here
+                result = next(stream_results([mark_saved_duplicate(filled)]))
+                if i < len(urls):
+                    # Most people move on to the next result, so get it ready while they read this one
+                    fetcher.prefetch([urls[i]])
+            full_content = print_result(i, result)
 
             save_prompt = input("Do you want to save this result to a file? (y/n): ").strip()
             if save_prompt.lower() == 'y':
                 # User wants to save - format as HTML and save to saved_html folder
-                save_to_html(full_content, result['title'], result['url'])
+                # Render once; the same HTML is reused for the email body
+                html_fragment = render_if_small(full_content)
+                save_to_html(full_content, result['title'], result['url'], body_fragment=html_fragment,
+                             query=query)
                 SRAM = input("Would you like to send this response via email? (y/n): ").strip()
                 if SRAM.lower() == 'y':
                     RECIPIENT_EMAIL = input("Enter recipient email address: ").strip()
-                    send_email(f"Search Result: {result['title']}", full_content, RECIPIENT_EMAIL)
+                    send_email(f"Search Result: {result['title']}", full_content, RECIPIENT_EMAIL,
+                               html_body=html_fragment)
                     return response
                 else:
                     return response
@@ -453,34 +874,19 @@ def search_agent(query, max_results=5):
                 else:
                     return response   
                 
-        # Return the full response for potential further processing
+        # Return the response (results without their page bodies) for potential further processing
         
         
     except Exception as e:
         # Catch any errors (network issues, API errors, etc.)
         # Always good practice to handle exceptions with APIs
+        metrics.inc('search_errors')
         print(f"❌ Error in search: {str(e)}")
         return None
 
 
-
-
-
-def main():
-    """
-    Main function: Entry point of the program
-    
-    This demonstrates:
-    - Program structure and flow control
-    - User input handling
-    - Menu-driven interfaces
-    - While loops for continuous operation
-    
-    Teaching Notes:
-    - main() is a common convention for the program's entry point
-    - We use while True for an infinite loop that runs until user chooses to exit
-    - The menu pattern is common in CLI applications
-    """
+def print_startup_info():
+    """Print the program header and check that the Tavily API key is loaded."""
     # Print a nice header using string multiplication for the line
     print("=" * 60)
     print("🤖 TAVILY Research Document Creator")
@@ -501,48 +907,417 @@ def main():
                 for line in f:
                     if 'TAVILY' in line:
                         print(f"   {line.strip()}")
-    
-# Initialize the GUI and run the application
-if __name__ == "__main__":
-    root = tk.Tk()
-    gui = SearchGUI(root)
-    setup_gui_redirection(gui)
-    
-    gui.append_text("=" * 60 + "\n")
-    gui.append_text("🤖 TAVILY Research Document Creator\n")
-    gui.append_text("=" * 60 + "\n\n")
-    
-    # Debug: Check if API key is loaded
-    api_key = os.environ.get('TAVILY_API_KEY')
-    if api_key:
-        gui.append_text(f"✅ API Key loaded: {api_key[:10]}...\n\n" if len(api_key) > 10 else "✅ API Key loaded\n\n")
+    return bool(api_key)
+
+
+def read_text_arg(path):
+    """Read a text file, or standard input when the path is '-'."""
+    if path == '-':
+        return sys.stdin.read()
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+# --- 3. HEADLESS COMMANDS (no window needed, e.g. for cron or a server) ---
+
+def command_search(args):
+    """Run one search and print, save and/or email every result without prompting."""
+    if not os.environ.get('TAVILY_API_KEY'):
+        print_startup_info()
+        return 1
+    print(f"\n🔍 SEARCH AGENT: Searching for '{args.query}'...\n")
+    # Page bodies are only needed when they are printed, saved or emailed
+    lazy = LAZY_RAW_CONTENT and (args.brief and not (args.save or args.email or args.digest))
+    try:
+        response = tavily_search(args.query, max_results=args.max_results, refresh=args.refresh,
+                                 include_raw_content=not lazy)
+    except Exception as e:
+        metrics.inc('search_errors')
+        print(f"❌ Error in search: {str(e)}")
+        return 1
+    results = dedupe_results(response.pop('results', []))
+    print(f"Found {len(results)} results:\n")
+    if args.digest:
+        send_digest(results, args.digest, f"Search Results: {args.query}")
+    # One result at a time, with very large bodies moved to temp files
+    from spill import stream_results
+    for i, result in enumerate(stream_results(results), 1):
+        full_content = print_result(i, result, show_content=not args.brief)
+        if args.save or args.email:
+            # Render once; the same HTML is reused for the email body
+            html_fragment = render_if_small(full_content)
+            if args.save and result.get('duplicate_of'):
+                print("♻️ Not saving again - a near-identical page is already saved.")
+            elif args.save:
+                save_to_html(full_content, result['title'], result['url'],
+                             body_fragment=html_fragment, open_browser=False, query=args.query)
+            if args.email:
+                send_email(f"Search Result: {result['title']}", full_content, args.email,
+                           html_body=html_fragment)
+    return 0
+
+
+def command_save(args):
+    """Save a Markdown/text file as a formatted HTML page in saved_html."""
+    content = read_text_arg(args.file)
+    save_id = save_to_html(content, args.title, args.url, open_browser=args.open)
+    return 0 if save_id else 1
+
+
+def command_send(args):
+    """Email a Markdown/text file."""
+    content = read_text_arg(args.file)
+    send_email(args.subject, content, args.to)
+    return 0
+
+
+def command_batch(args):
+    """Run every query in a file at the same time and print a summary."""
+    from batch_search import load_queries, iter_batch, search_batch, print_batch_summary
+    if not os.environ.get('TAVILY_API_KEY'):
+        print_startup_info()
+        return 1
+    queries = load_queries(args.file)
+    if args.save and not args.digest:
+        # Save each query's pages as its search finishes and keep only the
+        # titles and URLs, so memory doesn't grow with the size of the batch
+        from spill import stream_results
+        batch_results = []
+        for entry in iter_batch(queries, max_results=args.max_results, concurrency=args.concurrency):
+            results = (entry['response'] or {}).pop('results', [])
+            kept = []
+            for result in stream_results(results):
+                full_content = result.get('raw_content', '') or result.get('content', '')
+                save_to_html(full_content, result['title'], result['url'], open_browser=False,
+                             query=entry['query'])
+                kept.append({'title': result['title'], 'url': result['url'], 'score': result.get('score')})
+            if entry['response'] is not None:
+                entry['response']['results'] = kept
+            batch_results.append(entry)
+        print_batch_summary(batch_results)
+        return 1 if any(entry['error'] for entry in batch_results) else 0
+
+    batch_results = search_batch(queries, max_results=args.max_results,
+                                 concurrency=args.concurrency)
+    print_batch_summary(batch_results)
+    if args.digest:
+        all_results = dedupe_results([dict(result, query=entry['query'])
+                                      for entry in batch_results
+                                      for result in (entry['response'] or {}).get('results', [])])
+        send_digest(all_results, args.digest, f"Search Digest: {len(batch_results)} queries")
+    if args.save:
+        for entry in batch_results:
+            for result in (entry['response'] or {}).get('results', []):
+                full_content = result.get('raw_content', '') or result.get('content', '')
+                save_to_html(full_content, result['title'], result['url'], open_browser=False,
+                             query=entry['query'])
+    return 1 if any(entry['error'] for entry in batch_results) else 0
+
+
+def command_pipeline(args):
+    """
+    Run every query in a file through a staged pipeline: fetch -> render -> save -> email.
+    Each stage has its own workers and a bounded queue, so searching, rendering,
+    writing and sending all happen at the same time.
+    """
+    from batch_search import load_queries
+    from staged_pipeline import Stage, StagedPipeline
+    if not os.environ.get('TAVILY_API_KEY'):
+        print_startup_info()
+        return 1
+
+    def fetch(query):
+        response = tavily_search(query, max_results=args.max_results)
+        return [dict(result, query=query) for result in dedupe_results(response.get('results', []))]
+
+    def render(item):
+        item['full_content'] = item.get('raw_content', '') or item.get('content', '')
+        item['html'] = render_markdown(item['full_content'])
+        return item
+
+    def persist(item):
+        if item.get('duplicate_of'):
+            print(f"♻️ Not saving {item['url']} again - a near-identical page is already saved.")
+        else:
+            save_to_html(item['full_content'], item['title'], item['url'], body_fragment=item['html'],
+                         open_browser=False, query=item['query'])
+        return item
+
+    def deliver(item):
+        # Sent here rather than through the outbox, so this stage's timings show the real SMTP cost;
+        # a failure raises and is counted in the stage's errors
+        msg = build_email(f"Search Result: {item['title']}", item['full_content'], args.email,
+                          html_body=item['html'])
+        deliver_email(msg)
+        print(f"🎉 Email sent successfully to {args.email}!")
+
+    stages = [Stage('fetch', fetch, args.fetch_workers, args.queue_size),
+              Stage('render', render, args.render_workers, args.queue_size)]
+    if not args.no_save:
+        stages.append(Stage('persist', persist, args.persist_workers, args.queue_size))
+    if args.email:
+        stages.append(Stage('deliver', deliver, args.deliver_workers, args.queue_size))
+
+    queries = load_queries(args.file)
+    print(f"\n🏭 Running {len(queries)} queries through: {' -> '.join(stage.name for stage in stages)}")
+    pipeline = StagedPipeline(stages).start()
+    for query in queries:
+        pipeline.submit(query)
+    pipeline.finish()
+    rows = pipeline.report()
+    return 1 if any(row['errors'] for row in rows) else 0
+
+
+def command_lookup(args):
+    """Look through saved results without running a new search."""
+    matches = lookup_saved(" ".join(args.text), limit=args.limit)
+    return 0 if matches else 1
+
+
+def command_open(args):
+    """Write the HTML page for a saved result (by id or path) and open it."""
+    filepath = saved_view(args.saved)
+    if filepath is None:
+        print(f"❌ No saved result called '{args.saved}'")
+        return 1
+    open_in_browser(filepath)
+    return 0
+
+
+def command_outbox(args):
+    """Show the outbox, optionally retrying dead letters and sending what is due."""
+    box = get_outbox()
+    if args.retry_dead:
+        print(f"🔁 {box.retry_dead()} dead-lettered email(s) queued again.")
+    if args.flush:
+        start_outbox_workers()
+        flush_outbox()
+    counts = box.counts()
+    print("📬 Outbox: " + ", ".join(f"{counts.get(state, 0)} {state}"
+                                    for state in ('pending', 'sending', 'sent', 'dead')))
+    for message_id, recipients, subject, attempts, last_error in box.dead_letters():
+        print(f"   ❌ {message_id[:12]} to {recipients}: {subject} ({attempts} tries, last error: {last_error})")
+    return 0
+
+
+def command_export(args):
+    """Print archived results as JSON lines (or a summary of the archive)."""
+    exporter = get_result_exporter()
+    if args.summary:
+        segments = exporter.manifest()['segments']
+        print(f"🗄️ Export archive in {EXPORT_FOLDER}: {len(segments)} file(s)")
+        for segment in segments:
+            print(f"   {segment['file']}: {segment['rows']} rows from {segment['queries']} searches, "
+                  f"{segment['bytes'] / 1024:.1f} KB ({segment['first_searched_at']} to {segment['last_searched_at']})")
+        return 0
+    fields = args.fields.split(",") if args.fields else None
+    for row in exporter.read(query=args.query, since=args.since, fields=fields):
+        print(json.dumps(row, ensure_ascii=False))
+    return 0
+
+
+def command_usage(args):
+    """Show Tavily calls and estimated credits per API key and month."""
+    rows = get_api_usage().usage()
+    if not rows:
+        print("📈 No Tavily calls recorded yet.")
+        return 0
+    print(f"📈 Tavily usage{f' (plan: {TAVILY_MONTHLY_CREDITS} credits/month)' if TAVILY_MONTHLY_CREDITS else ''}:")
+    for row in rows:
+        print(f"   {row['month']}  key {row['key_id']}: {row['calls']} calls, ~{row['credits']:g} credits, "
+              f"{row['throttled']} rate-limited, {row['failures']} failed attempts")
+    return 0
+
+
+def command_watch(args):
+    """Manage the watchlist, or run it (only new or changed results are saved and emailed)."""
+    from watchlist import run_watchlist
+    watchlist = get_watchlist()
+    if args.watch_command == 'add':
+        watchlist.add(args.query, args.every * 60, recipients=args.to or (), max_results=args.max_results)
+        print(f"👀 Watching '{args.query}' every {args.every:g} minute(s).")
+    elif args.watch_command == 'remove':
+        if not watchlist.remove(args.query):
+            print(f"❌ '{args.query}' is not on the watchlist.")
+            return 1
+        print(f"🗑️ Stopped watching '{args.query}'.")
+    elif args.watch_command == 'list':
+        watches = watchlist.watches()
+        if not watches:
+            print("👀 The watchlist is empty.")
+        for watch in watches:
+            to = ", ".join(watch['recipients']) or "nobody"
+            print(f"👀 {watch['query']} - every {watch['interval_seconds'] / 60:g} min, "
+                  f"{watch['max_results']} results, email {to}")
     else:
-        gui.append_text("❌ No API key found in environment variables\n")
-        gui.append_text("\n🔍 Debugging Info:\n")
-        gui.append_text(f"   Current directory: {os.getcwd()}\n")
-        gui.append_text(f"   .env file exists: {os.path.exists('.env')}\n")
-        if os.path.exists('.env'):
-            gui.append_text("\n   Contents of .env file:\n")
-            with open('.env', 'r') as f:
-                for line in f:
-                    if 'TAVILY' in line:
-                        gui.append_text(f"   {line.strip()}\n")
-    
-    # Run the search loop in a separate thread so the GUI remains responsive
-    def run_search_loop():
-        repeat_search = True
-        while repeat_search:
-            query = input("\nEnter a search query (or 'quit' to exit): ").strip()
-            if query.lower() == "quit":
-                repeat_search = False
-                gui.append_text("\n👋 Goodbye!\n")
-                root.quit()
-            elif query:
-                search_agent(query)
-            else:
-                gui.append_text("❌ Search query cannot be empty!\n")
+        if not os.environ.get('TAVILY_API_KEY'):
+            print_startup_info()
+            return 1
+        try:
+            run_watchlist(watchlist, once=args.once, save=not args.no_save)
+        except KeyboardInterrupt:
+            print("\n👋 Watchlist stopped.")
+    watchlist.close()
+    return 0
+
+
+def command_gui(args):
+    """Open the Tk window with the interactive search loop."""
+    from search_gui import run_gui  # Only the GUI needs tkinter
+    resume_outbox()
+    run_gui(search_agent, lookup_fn=lookup_saved)
+    return 0
+
+
+def command_serve(args):
+    """Run the JSON HTTP service so several people can search, save and send at once."""
+    from search_service import run_service
+    if not os.environ.get('TAVILY_API_KEY'):
+        print_startup_info()
+        return 1
+    resume_outbox()
+    return run_service(args.host, args.port, workers=args.workers, timeout=args.timeout,
+                       token=os.environ.get('SERVICE_TOKEN'))
+
+
+def build_arg_parser():
+    """Build the command-line parser for the GUI and the headless subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="TavilySSS.py",
+        description="Tavily Search, Save, Send. Run without a command to open the window.",
+    )
+    parser.add_argument("--metrics", metavar="PATH", default=METRICS_FILE,
+                        help="write stage timings here on exit (.prom for Prometheus, else JSON lines)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    gui_parser = subparsers.add_parser("gui", help="open the search window (default)")
+    gui_parser.set_defaults(func=command_gui)
+
+    search_parser = subparsers.add_parser("search", help="run one search without the window")
+    search_parser.add_argument("query", help="what to search for")
+    search_parser.add_argument("-n", "--max-results", type=int, default=5, help="most results to return")
+    search_parser.add_argument("--save", action="store_true", help="save every result to saved_html")
+    search_parser.add_argument("--email", metavar="ADDRESS", help="email every result to this address")
+    search_parser.add_argument("--digest", nargs="+", metavar="ADDRESS",
+                               help="email all results as one digest to these addresses")
+    search_parser.add_argument("--brief", action="store_true", help="don't print the full page content")
+    search_parser.add_argument("--refresh", action="store_true", help="ignore the search cache")
+    search_parser.set_defaults(func=command_search)
+
+    save_parser = subparsers.add_parser("save", help="save a Markdown/text file as an HTML page")
+    save_parser.add_argument("file", help="file to save ('-' reads standard input)")
+    save_parser.add_argument("--title", default="Saved Result", help="page title")
+    save_parser.add_argument("--url", default="", help="source URL shown on the page")
+    save_parser.add_argument("--open", action="store_true", help="open the page in the browser")
+    save_parser.set_defaults(func=command_save)
+
+    send_parser = subparsers.add_parser("send", help="email a Markdown/text file")
+    send_parser.add_argument("file", help="file to send ('-' reads standard input)")
+    send_parser.add_argument("--to", required=True, metavar="ADDRESS", help="recipient email address")
+    send_parser.add_argument("--subject", default="Search Result", help="email subject")
+    send_parser.set_defaults(func=command_send)
+
+    batch_parser = subparsers.add_parser("batch", help="run many searches from a file at once")
+    batch_parser.add_argument("file", help="text file with one query per line")
+    batch_parser.add_argument("-n", "--max-results", type=int, default=5, help="most results per query")
+    batch_parser.add_argument("-c", "--concurrency", type=int, default=4, help="searches run at the same time")
+    batch_parser.add_argument("--save", action="store_true", help="save every result to saved_html")
+    batch_parser.add_argument("--digest", nargs="+", metavar="ADDRESS",
+                              help="email every query's results as one digest to these addresses")
+    batch_parser.set_defaults(func=command_batch)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="run many searches through overlapping fetch/render/save/email stages")
+    pipeline_parser.add_argument("file", help="text file with one query per line")
+    pipeline_parser.add_argument("-n", "--max-results", type=int, default=5, help="most results per query")
+    pipeline_parser.add_argument("--email", metavar="ADDRESS", help="email every result to this address")
+    pipeline_parser.add_argument("--no-save", action="store_true", help="don't save the results")
+    pipeline_parser.add_argument("--fetch-workers", type=int, default=4, help="searches running at the same time")
+    pipeline_parser.add_argument("--render-workers", type=int, default=1,
+                                 help="render threads (renders share one Markdown converter, so 1 is usually enough)")
+    pipeline_parser.add_argument("--persist-workers", type=int, default=2, help="saves at the same time")
+    pipeline_parser.add_argument("--deliver-workers", type=int, default=2, help="emails sent at the same time")
+    pipeline_parser.add_argument("--queue-size", type=int, default=8, help="most items waiting in front of each stage")
+    pipeline_parser.set_defaults(func=command_pipeline)
+
+    lookup_parser = subparsers.add_parser("lookup", help="check saved results for words or a URL")
+    lookup_parser.add_argument("text", nargs="+", help="words to look for, or a URL")
+    lookup_parser.add_argument("-n", "--limit", type=int, default=10, help="most matches to show")
+    lookup_parser.set_defaults(func=command_lookup)
+
+    open_parser = subparsers.add_parser("open", help="open a saved result in the browser")
+    open_parser.add_argument("saved", help="save id (or path) shown when it was saved")
+    open_parser.set_defaults(func=command_open)
+
+    outbox_parser = subparsers.add_parser("outbox", help="show queued, sent and failed emails")
+    outbox_parser.add_argument("--flush", action="store_true", help="send everything that is due now")
+    outbox_parser.add_argument("--retry-dead", action="store_true", help="queue dead-lettered emails again")
+    outbox_parser.set_defaults(func=command_outbox)
+
+    watch_parser = subparsers.add_parser("watch", help="re-run saved searches and report only changes")
+    watch_subparsers = watch_parser.add_subparsers(dest="watch_command", required=True)
+    watch_add = watch_subparsers.add_parser("add", help="add a saved search")
+    watch_add.add_argument("query", help="what to search for")
+    watch_add.add_argument("--every", type=float, default=60, metavar="MINUTES", help="how often to run it")
+    watch_add.add_argument("--to", nargs="+", metavar="ADDRESS", help="email new/changed results here")
+    watch_add.add_argument("-n", "--max-results", type=int, default=5, help="most results per run")
+    watch_remove = watch_subparsers.add_parser("remove", help="delete a saved search")
+    watch_remove.add_argument("query", help="the saved search to delete")
+    watch_subparsers.add_parser("list", help="show the saved searches")
+    watch_run = watch_subparsers.add_parser("run", help="keep running saved searches as they come due")
+    watch_run.add_argument("--once", action="store_true", help="run what is due now, then exit (for cron)")
+    watch_run.add_argument("--no-save", action="store_true", help="only email changes, don't save them")
+    watch_parser.set_defaults(func=command_watch)
+
+    export_parser = subparsers.add_parser("export", help="print archived search results as JSON lines")
+    export_parser.add_argument("--query", help="only results for this exact query")
+    export_parser.add_argument("--since", metavar="DATE", help="only results searched on or after this date (YYYY-MM-DD)")
+    export_parser.add_argument("--fields", help="comma-separated fields to keep, e.g. query,url,score")
+    export_parser.add_argument("--summary", action="store_true", help="show the archive's files and row counts")
+    export_parser.set_defaults(func=command_export)
+
+    usage_parser = subparsers.add_parser("usage", help="show Tavily calls and credits used per key and month")
+    usage_parser.set_defaults(func=command_usage)
+
+    serve_parser = subparsers.add_parser("serve", help="run a JSON HTTP service for many users at once")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    serve_parser.add_argument("-w", "--workers", type=int, default=8,
+                              help="searches, saves and sends running at the same time")
+    serve_parser.add_argument("--timeout", type=float, default=60, help="seconds before a request gives up")
+    serve_parser.set_defaults(func=command_serve)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Main function: Entry point of the program
     
-    search_thread = threading.Thread(target=run_search_loop, daemon=True)
-    search_thread.start()
+    This demonstrates:
+    - Program structure and flow control
+    - Command-line arguments with argparse subcommands
     
-    root.mainloop()
+    Teaching Notes:
+    - main() is a common convention for the program's entry point
+    - With no command the search window opens, just like before
+    - The headless commands (search, save, send, batch, lookup) never import tkinter,
+      so they start quickly and also work from cron or on a server with no display
+    """
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.metrics:
+        atexit.register(metrics.write, args.metrics)
+    if args.command is None:
+        status = command_gui(args)
+    else:
+        status = args.func(args)
+    # The process exits right after (also when the window is closed), so send what was queued first
+    flush_outbox()
+    return status
+
+# Initialize the GUI (or run a headless command) and run the application
+if __name__ == "__main__":
+    # Register this module under its real name so helper modules that do
+    # `import TavilySSS` share its settings, caches and connection pools
+    sys.modules.setdefault('TavilySSS', sys.modules['__main__'])
+    sys.exit(main())
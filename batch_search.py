@@ -0,0 +1,106 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from TavilySSS import get_tavily_client, tavily_search
+
+# How many searches run at the same time by default
+DEFAULT_CONCURRENCY = 4
+
+
+def load_queries(path):
+    """
+    Read search queries from a text file, one per line.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                queries.append(line)
+    return queries
+
+
+def iter_batch(queries, max_results=5, concurrency=DEFAULT_CONCURRENCY, client=None):
+    """
+    Run many searches at the same time on a thread pool and yield each
+    query's entry as soon as it (and every query before it) is done.
+
+    At most `concurrency` searches are waiting to be picked up at any time,
+    so a slow consumer (e.g. one saving every page) keeps memory bounded
+    instead of piling up every response.
+
+    Args are the same as search_batch; yields the same dicts it returns.
+    """
+    client = client or get_tavily_client()
+    if client is None:
+        print("❌ No TAVILY_API_KEY found in environment variables")
+        for q in queries:
+            yield {'query': q, 'response': None, 'error': "No TAVILY_API_KEY", 'elapsed': 0.0}
+        return
+
+    def _run_one(query):
+        start = time.perf_counter()
+        try:
+            response = tavily_search(query, max_results=max_results, client=client)
+            error = None
+        except Exception as e:
+            response = None
+            error = str(e)
+        return {'query': query, 'response': response, 'error': error,
+                'elapsed': time.perf_counter() - start}
+
+    concurrency = max(1, concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Keep a window of submitted searches and hand them out in input order
+        in_flight = deque()
+        for query in queries:
+            in_flight.append(executor.submit(_run_one, query))
+            if len(in_flight) >= concurrency * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def search_batch(queries, max_results=5, concurrency=DEFAULT_CONCURRENCY, client=None):
+    """
+    Run many searches at the same time on a thread pool.
+
+    All searches share one TavilyClient. A failing query does not stop the
+    others; its error is recorded in its entry instead.
+
+    Args:
+        queries (list): The search queries
+        max_results (int): Most results per query
+        concurrency (int): Most searches in flight at once
+        client (TavilyClient): Client to use (defaults to the shared client)
+
+    Returns:
+        list: One dict per query, in the same order as `queries`, with keys
+        'query', 'response' (None on failure), 'error' (None on success)
+        and 'elapsed' (seconds).
+    """
+    return list(iter_batch(queries, max_results=max_results, concurrency=concurrency, client=client))
+
+
+def print_batch_summary(batch_results):
+    """Print one line per query showing how many results came back (or the error)."""
+    print(f"\n{'='*70}")
+    print(f"📦 Batch finished: {len(batch_results)} queries")
+    print(f"{'='*70}")
+    for i, entry in enumerate(batch_results, 1):
+        if entry['error']:
+            print(f"{i:>3}. ❌ {entry['query']} - {entry['error']}")
+        else:
+            count = len(entry['response'].get('results', []))
+            print(f"{i:>3}. ✅ {entry['query']} - {count} results ({entry['elapsed']:.2f}s)")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python batch_search.py <queries.txt> [concurrency]")
+        sys.exit(1)
+    batch_concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CONCURRENCY
+    print_batch_summary(search_batch(load_queries(sys.argv[1]), concurrency=batch_concurrency))
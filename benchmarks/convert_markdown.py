@@ -0,0 +1,132 @@
+"""
+Compare convert_markdown_to_html against the original implementation.
+
+Checks that both produce the same HTML for random inputs, then times them on
+large synthetic pages with many inline code spans.
+
+Run from the project folder:
+    python -m benchmarks.convert_markdown
+"""
+import html
+import random
+import re
+import sys
+import time
+
+from TavilySSS import convert_markdown_to_html
+
+
+def legacy_convert_markdown_to_html(md_text: str) -> str:
+    """The original placeholder/str.replace converter, kept only for comparison."""
+    # Extract fenced code blocks
+    code_blocks = []
+
+    def _code_block_repl(m):
+        code_blocks.append(m.group(1))
+        return f"@@CODEBLOCK{len(code_blocks)-1}@@"
+
+    text = re.sub(r"```\n?(.*?)\n?```", _code_block_repl, md_text, flags=re.DOTALL)
+
+    # Escape remaining text
+    escaped = html.escape(text)
+
+    # Handle inline code
+    inline_codes = []
+    def _inline_repl(m):
+        inline_codes.append(m.group(1))
+        return f"@@INLINE{len(inline_codes)-1}@@"
+
+    escaped = re.sub(r"`([^`]+?)`", _inline_repl, escaped)
+
+    # Convert lines
+    out_lines = []
+    for line in escaped.splitlines():
+        if line.startswith('@@CODEBLOCK'):
+            m = re.match(r"@@CODEBLOCK(\d+)@@", line)
+            if m:
+                idx = int(m.group(1))
+                code = html.escape(code_blocks[idx])
+                out_lines.append(f"<pre><code>{code}</code></pre>")
+            else:
+                out_lines.append(line)
+        elif line.startswith('# '):
+            out_lines.append(f"<h1>{line[2:].strip()}</h1>")
+        elif line.startswith('## '):
+            out_lines.append(f"<h2>{line[3:].strip()}</h2>")
+        elif line.startswith('### '):
+            out_lines.append(f"<h3>{line[4:].strip()}</h3>")
+        elif line.strip() == '---':
+            out_lines.append('<hr/>')
+        elif line.strip() == '':
+            out_lines.append('')
+        else:
+            # Restore inline code placeholders
+            restored = line
+            for i, code in enumerate(inline_codes):
+                restored = restored.replace(f"@@INLINE{i}@@", f"<code>{html.escape(code)}</code>")
+            out_lines.append(f"<p>{restored}</p>")
+
+    return "\n".join(out_lines)
+
+
+
+# Characters the random inputs are built from (backticks, fences, headings, rules, line breaks)
+FUZZ_ALPHABET = ["`", "```", "\n", "\r\n", "\r", "# ", "## ", "### ", "---", " ", "a", "<", "&", '"', "\x0c"]
+
+
+def random_markdown(rng, length):
+    """Build a random string from FUZZ_ALPHABET."""
+    return "".join(rng.choice(FUZZ_ALPHABET) for _ in range(length))
+
+
+def synthetic_page(inline_spans, lines_per_block=20):
+    """Build a large scraped-looking page with `inline_spans` inline code spans."""
+    lines = ["# Synthetic page", ""]
+    for i in range(inline_spans):
+        lines.append(f"Paragraph {i} calls `func_{i}()` with <args> & returns `value_{i}`.")
+        if i % lines_per_block == 0:
+            lines.append("```")
+            lines.append(f"def func_{i}():\n    return {i}")
+            lines.append("```")
+            lines.append("---")
+    return "\n".join(lines)
+
+
+def check_same_output(cases=20000, seed=1234):
+    """Return the number of random inputs checked, exiting if any output differs."""
+    rng = random.Random(seed)
+    for n in range(cases):
+        text = random_markdown(rng, rng.randint(0, 40))
+        expected = legacy_convert_markdown_to_html(text)
+        actual = convert_markdown_to_html(text)
+        if expected != actual:
+            print(f"❌ Output differs for input {text!r}")
+            print(f"   original: {expected!r}")
+            print(f"   new:      {actual!r}")
+            sys.exit(1)
+    return cases
+
+
+def time_call(func, text, repeat=3):
+    """Best wall-clock time of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    checked = check_same_output()
+    print(f"✅ Same output for {checked} random inputs")
+
+    print(f"\n{'spans':>8} {'chars':>10} {'original':>10} {'new':>10} {'speedup':>8}")
+    for spans in (250, 1000, 2000):
+        page = synthetic_page(spans)
+        if legacy_convert_markdown_to_html(page) != convert_markdown_to_html(page):
+            print(f"❌ Output differs for synthetic page with {spans} spans")
+            sys.exit(1)
+        old = time_call(legacy_convert_markdown_to_html, page)
+        new = time_call(convert_markdown_to_html, page)
+        print(f"{spans:>8} {len(page):>10} {old:>9.3f}s {new:>9.3f}s {old / new:>7.1f}x")
@@ -0,0 +1,155 @@
+"""
+Offline stand-ins for the Tavily API and the Gmail SMTP server, used by the benchmarks.
+"""
+import random
+import socketserver
+import threading
+import time
+
+# Words the fake page bodies are built from
+_WORDS = ("search", "result", "python", "markdown", "server", "email", "agent", "content",
+          "research", "page", "cache", "thread", "socket", "render", "table", "value")
+
+
+def fake_page(seed, size):
+    """
+    Build a Markdown-ish page of roughly `size` characters.
+    The same seed always gives the same page.
+    """
+    rng = random.Random(seed)
+    lines = [f"# Page {seed}", ""]
+    length = 0
+    n = 0
+    while length < size:
+        n += 1
+        if n % 25 == 0:
+            block = "```\n" + "\n".join(f"x_{n}_{i} = {i}" for i in range(5)) + "\n```"
+            lines.append(block)
+            length += len(block)
+        elif n % 10 == 0:
+            heading = f"## Section {n}"
+            lines.append(heading)
+            length += len(heading)
+        else:
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+            words[rng.randrange(len(words))] = f"`{rng.choice(_WORDS)}()`"
+            line = " ".join(words) + "."
+            lines.append(line)
+            length += len(line)
+    return "\n".join(lines)
+
+
+class FakeTavilyClient:
+    """
+    Stands in for TavilyClient. search() returns `results_per_query` results
+    whose raw_content is about `content_size` characters (None unless
+    include_raw_content is set, like the real API), after sleeping for
+    `latency` seconds to imitate the network round trip.
+    """
+
+    def __init__(self, results_per_query=5, content_size=20000, latency=0.0):
+        self.results_per_query = results_per_query
+        self.content_size = content_size
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, max_results=5, include_raw_content=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self.latency:
+            time.sleep(self.latency)
+        count = min(max_results, self.results_per_query)
+        results = []
+        for i in range(count):
+            seed = f"{query}-{call}-{i}"
+            raw = fake_page(seed, self.content_size)
+            results.append({
+                'title': f"Fake result {i + 1} for {query}",
+                'url': f"https://example.com/{abs(hash(seed))}",
+                'content': raw[:300],
+                'raw_content': raw if include_raw_content else None,
+                'score': round(1.0 - i * 0.1, 2),
+            })
+        return {'query': query, 'results': results, 'response_time': self.latency}
+
+    def extract(self, urls, **kwargs):
+        """Return raw content for each URL (same shape as Tavily's extract endpoint)."""
+        if isinstance(urls, str):
+            urls = [urls]
+        if self.latency:
+            time.sleep(self.latency)
+        return {'results': [{'url': url, 'raw_content': fake_page(url, self.content_size)} for url in urls],
+                'failed_results': []}
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib to deliver a message, then throws it away."""
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode('ascii'))
+
+    def handle(self):
+        self._reply("220 localhost sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self._reply("250-localhost")
+                self._reply("250-SIZE 104857600")
+                self._reply("250 8BITMIME")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    size += len(data_line)
+                self.server.record(size)
+                self._reply("250 OK: queued")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP", "AUTH"):
+                if command == "AUTH":
+                    self._reply("235 Authentication successful")
+                else:
+                    self._reply("250 OK")
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server that accepts and discards every message.
+    Start it with start(), point SMTPPool at ('127.0.0.1', sink.port, use_ssl=False).
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _SMTPSinkHandler)
+        self.messages = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes_received += size
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,186 @@
+"""
+End-to-end benchmark of search -> render -> save -> email, fully offline.
+
+TavilyClient is swapped for FakeTavilyClient and emails go to a local SMTP
+sink, so no API quota or Gmail account is used. Saved pages go to a
+temporary folder. Prints latency percentiles and throughput for each stage.
+
+Run from the project folder:
+    python -m benchmarks.pipeline [--iterations 50] [--results 5] [--content-size 20000]
+
+Use --json-out to keep the numbers and --compare to fail (exit code 1) when
+a stage's median got slower than a previous run by more than --tolerance.
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import TavilySSS
+from smtp_pool import SMTPPool
+from benchmarks.fakes import FakeTavilyClient, SMTPSink
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, samples, items=0, nbytes=0):
+    """Build the stats for one stage from its list of per-call timings (seconds)."""
+    total = sum(samples)
+    return {
+        'stage': name,
+        'calls': len(samples),
+        'mean_ms': total / len(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p90_ms': percentile(samples, 90) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'ops_per_s': len(samples) / total if total else 0.0,
+        'items_per_s': items / total if total else 0.0,
+        'mb_per_s': nbytes / total / 1e6 if total else 0.0,
+    }
+
+
+def timed(func, *args, **kwargs):
+    """Call func and return (seconds taken, return value)."""
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    return time.perf_counter() - start, value
+
+
+def run_benchmark(iterations, results, content_size, latency):
+    """Run every stage `iterations` times and return a list of stage stats."""
+    fake_client = FakeTavilyClient(results_per_query=results, content_size=content_size, latency=latency)
+    sink = SMTPSink().start()
+    saved_dir = tempfile.TemporaryDirectory()
+
+    # Point the app at the stand-ins
+    TavilySSS.tavily_client = fake_client
+    TavilySSS.SEARCH_CACHE_TTL_SECONDS = 0
+    # Time the SMTP send itself rather than just queueing it in the outbox
+    TavilySSS.EMAIL_OUTBOX = False
+    TavilySSS.SAVED_HTML_FOLDER = saved_dir.name
+    TavilySSS.RESULT_INDEX_FILE = os.path.join(saved_dir.name, 'result_index.sqlite3')
+    TavilySSS.DUPLICATE_INDEX_FILE = os.path.join(saved_dir.name, 'duplicate_index.sqlite3')
+    TavilySSS.EXPORT_FOLDER = os.path.join(saved_dir.name, 'exports')
+    TavilySSS.smtp_pool = SMTPPool("127.0.0.1", sink.port, use_ssl=False)
+    from markdown_render import get_renderer
+    renderer = get_renderer()
+
+    timings = {name: [] for name in ('tavily_search', 'render', 'save_to_html', 'send_email', 'search_agent')}
+    counts = {name: [0, 0] for name in timings}  # [items, bytes]
+
+    # Answers for search_agent's prompts: save? no, email? yes, to whom
+    answers = []
+    original_input = builtins.input
+    builtins.input = lambda prompt="": answers.pop(0)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) as quiet:
+            for n in range(iterations):
+                query = f"benchmark query {n}"
+
+                seconds, response = timed(TavilySSS.tavily_search, query, max_results=results, use_cache=False)
+                timings['tavily_search'].append(seconds)
+                counts['tavily_search'][0] += len(response['results'])
+
+                result = response['results'][0]
+                content = result['raw_content']
+
+                renderer.clear()
+                seconds, html_fragment = timed(TavilySSS.render_markdown, content)
+                timings['render'].append(seconds)
+                counts['render'][1] += len(content)
+
+                seconds, _ = timed(TavilySSS.save_to_html, content, result['title'], result['url'],
+                                   body_fragment=html_fragment, open_browser=False)
+                timings['save_to_html'].append(seconds)
+                counts['save_to_html'][1] += len(content)
+
+                seconds, _ = timed(TavilySSS.send_email, f"Search Result: {result['title']}", content,
+                                   "bench@example.com", html_body=html_fragment)
+                timings['send_email'].append(seconds)
+                counts['send_email'][1] += len(content)
+
+                # Whole interactive flow for one result (search_agent opens the browser
+                # when saving, so only the email branch is exercised here)
+                answers[:] = ['n', 'y', 'bench@example.com']
+                renderer.clear()
+                seconds, _ = timed(TavilySSS.search_agent, f"{query} (agent)", max_results=results)
+                timings['search_agent'].append(seconds)
+
+                # Keep the captured output from growing for the whole run
+                quiet.seek(0)
+                quiet.truncate()
+    finally:
+        builtins.input = original_input
+        TavilySSS.smtp_pool.close()
+        if TavilySSS.result_index is not None:
+            TavilySSS.result_index.close()
+            TavilySSS.result_index = None
+        if TavilySSS.duplicate_index is not None:
+            TavilySSS.duplicate_index.close()
+            TavilySSS.duplicate_index = None
+        sink.stop()
+        saved_dir.cleanup()
+
+    return [summarize(name, timings[name], *counts[name]) for name in timings]
+
+
+def print_report(stats):
+    print(f"\n{'stage':<15}{'calls':>7}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'ops/s':>10}{'MB/s':>9}")
+    for row in stats:
+        print(f"{row['stage']:<15}{row['calls']:>7}{row['mean_ms']:>8.2f}ms{row['p50_ms']:>8.2f}ms"
+              f"{row['p90_ms']:>8.2f}ms{row['p99_ms']:>8.2f}ms{row['ops_per_s']:>10.1f}{row['mb_per_s']:>9.2f}")
+
+
+def compare(stats, baseline_path, tolerance):
+    """Return the stages whose median is slower than the baseline by more than `tolerance`."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {row['stage']: row for row in json.load(f)['stages']}
+    slower = []
+    for row in stats:
+        old = baseline.get(row['stage'])
+        if old and old['p50_ms'] > 0 and row['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+            slower.append((row['stage'], old['p50_ms'], row['p50_ms']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the search/render/save/send flow.")
+    parser.add_argument("--iterations", type=int, default=50, help="runs of each stage")
+    parser.add_argument("--results", type=int, default=5, help="results per fake search")
+    parser.add_argument("--content-size", type=int, default=20000, help="characters of raw_content per result")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake API latency in seconds")
+    parser.add_argument("--json-out", metavar="PATH", help="write the stats to this JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    stats = run_benchmark(args.iterations, args.results, args.content_size, args.latency)
+    print_report(stats)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'stages': stats}, f, indent=2)
+    if args.compare:
+        slower = compare(stats, args.compare, args.tolerance)
+        for stage, old, new in slower:
+            print(f"❌ {stage} p50 went from {old:.2f}ms to {new:.2f}ms")
+        if slower:
+            return 1
+        print("✅ No stage slower than the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
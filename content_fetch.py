@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics  # Extract call timings
+
+# Tavily's extract endpoint takes at most 20 URLs per call
+EXTRACT_BATCH_SIZE = 20
+
+
+class ContentFetcher:
+    """
+    Fetches full page content on demand through Tavily's extract endpoint.
+
+    Searches can then skip include_raw_content and return only titles, URLs,
+    snippets and scores; the page bodies are pulled just for the results that
+    are actually shown, saved or emailed. URLs are batched into as few
+    extract calls as possible, recent pages are kept in memory (and on disk
+    when a cache is given, so repeating a search does not pay for the same
+    pages again), and the next result can be prefetched in the background
+    while the user reads the current one.
+
+    Args:
+        client (TavilyClient): Client whose extract() is called
+        batch_size (int): Most URLs sent in one extract call
+        max_entries (int): Most pages kept in memory
+        cache (SearchCache): On-disk cache for extracted pages, keyed by URL (optional)
+    """
+
+    def __init__(self, client, batch_size=EXTRACT_BATCH_SIZE, max_entries=64, cache=None):
+        self.client = client
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()   # url -> raw content ('' if extraction failed)
+        self._pending = {}            # url -> Future of a background fetch
+        # One background thread is enough to stay a result ahead of the reader
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+    def _remember(self, url, content):
+        with self._lock:
+            self._pages[url] = content
+            self._pages.move_to_end(url)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def _extract(self, urls):
+        """Call the extract endpoint for `urls` (in batches) and remember the pages."""
+        if self.cache is not None:
+            missing = []
+            for url in urls:
+                cached = self.cache.get(url, endpoint='extract')
+                if cached is None:
+                    missing.append(url)
+                else:
+                    self._remember(url, cached['raw_content'])
+            metrics.inc('content_cache_hits', len(urls) - len(missing))
+            urls = missing
+        for start in range(0, len(urls), self.batch_size):
+            batch = urls[start:start + self.batch_size]
+            with metrics.timer('tavily_extract'):
+                response = self.client.extract(urls=batch)
+            found = {r['url']: r.get('raw_content') or '' for r in response.get('results', [])}
+            metrics.inc('tavily_raw_content_bytes', sum(len(c) for c in found.values()))
+            for url in batch:
+                # Failed URLs are remembered as '' so the snippet is used instead
+                self._remember(url, found.get(url, ''))
+                if self.cache is not None and found.get(url):
+                    # Failures aren't kept on disk, so they are tried again next time
+                    self.cache.set(url, {'raw_content': found[url]}, endpoint='extract')
+
+    def fetch(self, urls):
+        """
+        Return {url: raw content} for every URL, fetching the missing ones in
+        as few extract calls as possible. Waits for any prefetch already
+        running for one of them instead of fetching it twice.
+        """
+        urls = list(dict.fromkeys(urls))
+        with self._lock:
+            waiting = [self._pending[u] for u in urls if u in self._pending]
+        for future in waiting:
+            try:
+                future.result()
+            except Exception:
+                pass  # Fetched again below
+        with self._lock:
+            missing = [u for u in urls if u not in self._pages]
+        if missing:
+            metrics.inc('content_fetch_misses', len(missing))
+            self._extract(missing)
+        with self._lock:
+            return {u: self._pages.get(u, '') for u in urls}
+
+    def prefetch(self, urls):
+        """Start fetching `urls` in the background (URLs already known are skipped)."""
+        with self._lock:
+            urls = [u for u in dict.fromkeys(urls) if u not in self._pages and u not in self._pending]
+            if not urls:
+                return None
+            future = self._executor.submit(self._extract, urls)
+            for url in urls:
+                self._pending[url] = future
+
+        def _done(_):
+            with self._lock:
+                for url in urls:
+                    if self._pending.get(url) is future:
+                        del self._pending[url]
+        future.add_done_callback(_done)
+        metrics.inc('content_prefetches', len(urls))
+        return future
+
+    def fill(self, results):
+        """
+        Return copies of `results` with 'raw_content' filled in (one batched
+        fetch for every result that doesn't have it yet).
+        """
+        fetched = self.fetch([r['url'] for r in results if not r.get('raw_content')])
+        return [r if r.get('raw_content') else dict(r, raw_content=fetched.get(r['url'], ''))
+                for r in results]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,131 @@
+import gzip
+import html as _html_module
+import re
+from email.message import EmailMessage
+
+# Largest digest email before it is split into parts (Gmail's limit is 25 MB
+# after base64 encoding, so stay well under it)
+DIGEST_MAX_BYTES = 10 * 1024 * 1024
+# Results longer than this are shortened in the email and attached in full (gzipped)
+ATTACH_THRESHOLD_CHARS = 20000
+# How much of a long result is shown in the email body
+EXCERPT_CHARS = 3000
+
+
+def _attachment_name(title, i):
+    """Safe file name for a result's attachment."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", title or "").strip("-")[:60] or "result"
+    return f"{i:02d}-{slug}.md.gz"
+
+
+def build_sections(results, render_fn, attach_threshold=ATTACH_THRESHOLD_CHARS, excerpt_chars=EXCERPT_CHARS):
+    """
+    Turn search results into digest sections.
+
+    Each section is a dict with 'text' (plain-text part), 'html' (HTML part),
+    'attachment' ((file name, gzipped bytes) or None) and 'size' (rough bytes
+    it adds to the email, used for splitting).
+    """
+    escape = _html_module.escape
+    sections = []
+    for i, result in enumerate(results, 1):
+        title = result.get('title') or result.get('url') or f"Result {i}"
+        url = result.get('url', '')
+        content = result.get('raw_content', '') or result.get('content', '') or ''
+        attachment = None
+        shown = content
+        if len(content) > attach_threshold:
+            name = _attachment_name(title, i)
+            attachment = (name, gzip.compress(content.encode('utf-8')))
+            shown = content[:excerpt_chars] + f"\n\n*(Shortened - the full {len(content)} characters are attached as {name})*"
+
+        alternates = result.get('alternate_urls', [])
+        header_lines = [f"{i}. {title}", url]
+        if alternates:
+            header_lines.append("Also at: " + ", ".join(alternates))
+        if result.get('query'):
+            header_lines.append(f"Query: {result['query']}")
+        text = "\n".join(header_lines) + "\n\n" + shown + "\n"
+
+        extra_html = ""
+        if alternates:
+            links = ", ".join(f"<a href=\"{escape(u)}\">{escape(u)}</a>" for u in alternates)
+            extra_html += f"<p><strong>Also at:</strong> {links}</p>"
+        if result.get('query'):
+            extra_html += f"<p><strong>Query:</strong> {escape(result['query'])}</p>"
+        html_part = (f"<section>\n<h2>{i}. <a href=\"{escape(url)}\">{escape(title)}</a></h2>\n"
+                     f"{extra_html}\n{render_fn(shown)}\n</section>")
+
+        # base64 makes attachments about a third bigger
+        size = len(text.encode('utf-8')) + len(html_part.encode('utf-8'))
+        if attachment:
+            size += len(attachment[1]) * 4 // 3
+        sections.append({'text': text, 'html': html_part, 'attachment': attachment, 'size': size})
+    return sections
+
+
+def split_sections(sections, max_bytes=DIGEST_MAX_BYTES):
+    """
+    Group sections into parts that each stay under `max_bytes`
+    (a single section bigger than that gets a part of its own).
+    """
+    parts = []
+    current = []
+    current_size = 0
+    for section in sections:
+        if current and current_size + section['size'] > max_bytes:
+            parts.append(current)
+            current = []
+            current_size = 0
+        current.append(section)
+        current_size += section['size']
+    if current:
+        parts.append(current)
+    return parts
+
+
+def build_digest_messages(results, recipients, subject, from_addr, render_fn,
+                          max_bytes=DIGEST_MAX_BYTES, bcc=False):
+    """
+    Build digest emails for a list of results, ready to send to every recipient at once.
+
+    Each MIME message is built once. The recipients go in the To header (or
+    Bcc when `bcc=True`, so they can't see each other), which lets one SMTP
+    session deliver it with a RCPT TO per recipient.
+
+    Args:
+        results (list): Search result dicts (title, url, raw_content/content, optional query)
+        recipients (list): Email addresses
+        subject (str): Subject line ("(part x of y)" is added when split)
+        from_addr (str): Sender address
+        render_fn (callable): Turns Markdown into an HTML fragment
+        max_bytes (int): Largest size of one email before splitting
+        bcc (bool): Hide the recipients from each other
+
+    Returns:
+        list: EmailMessage objects (one per part)
+    """
+    parts = split_sections(build_sections(results, render_fn), max_bytes)
+    messages = []
+    for n, part in enumerate(parts, 1):
+        msg = EmailMessage()
+        msg['Subject'] = subject if len(parts) == 1 else f"{subject} (part {n} of {len(parts)})"
+        msg['From'] = from_addr
+        if bcc:
+            msg['To'] = from_addr
+            msg['Bcc'] = ", ".join(recipients)
+        else:
+            msg['To'] = ", ".join(recipients)
+
+        intro = f"{len(part)} result(s)"
+        msg.set_content(intro + "\n\n" + "\n\n".join(section['text'] for section in part))
+        msg.add_alternative(
+            f"<p>{intro}</p>\n" + "\n<hr/>\n".join(section['html'] for section in part),
+            subtype='html',
+        )
+        for section in part:
+            if section['attachment']:
+                name, data = section['attachment']
+                msg.add_attachment(data, maintype='application', subtype='gzip', filename=name)
+        messages.append(msg)
+    return messages
@@ -0,0 +1,278 @@
+import email
+import email.policy
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from metrics import metrics  # Outbox counters
+
+
+class MailOutbox:
+    """
+    Durable queue of outgoing emails, stored in a SQLite file.
+
+    send_email puts messages here and returns right away; OutboxWorkers
+    deliver them in the background. A message that fails is retried with
+    exponential backoff and moved to the dead-letter state after
+    `max_attempts`. Each send request gets its own id, and the same id is
+    used as the Message-ID on every try. A caller that may repeat a request
+    (e.g. a client retrying after a timeout) passes the same `request_key`
+    so the repeat is not queued twice; sending the same email again later
+    is a new request and is sent again.
+
+    Several processes (the window, headless commands, the service) can share
+    one outbox file: claim() only takes a message if its status is still
+    what it read, and a message stays 'sending' until it is sent or its
+    lease runs out (the sender died), so two processes never send it together.
+
+    Args:
+        path (str): Location of the SQLite database file
+        max_attempts (int): Tries before a message is dead-lettered
+        base_delay (float): Seconds to wait after the first failure (doubles each time)
+        max_delay (float): Longest wait between tries
+        lease_seconds (float): How long a message may stay 'sending' before it is taken over
+    """
+
+    def __init__(self, path, max_attempts=6, base_delay=30, max_delay=3600, lease_seconds=600):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        # Signalled whenever a message is queued so idle workers wake up
+        self.new_mail = threading.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id TEXT PRIMARY KEY,
+                recipients TEXT NOT NULL,
+                subject TEXT,
+                message BLOB NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                last_error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def message_id_for(msg, request_key=''):
+        """Id for one send request: a hash of the message's recipients, subject and body plus `request_key`."""
+        digest = hashlib.sha256(str(request_key).encode('utf-8') + b'\0')
+        for header in ('To', 'Cc', 'Bcc', 'Subject'):
+            digest.update(str(msg.get(header, '')).encode('utf-8'))
+            digest.update(b'\0')
+        for part in msg.walk():
+            if not part.is_multipart():
+                digest.update(part.get_payload(decode=True) or b'')
+        return digest.hexdigest()[:32]
+
+    def enqueue(self, msg, request_key=None):
+        """
+        Queue an EmailMessage and return (id, True if newly queued).
+
+        Args:
+            msg (EmailMessage): The message to send
+            request_key (str): Names this send request; queueing the same message
+                with the same key again is ignored. Each call is a new request if None.
+        """
+        message_id = self.message_id_for(msg, request_key or uuid.uuid4().hex)
+        if 'Message-ID' not in msg:
+            # The same id in the header lets the receiving side spot duplicates too
+            msg['Message-ID'] = f"<{message_id}@tavilysss.local>"
+        recipients = ", ".join(str(msg.get(h)) for h in ('To', 'Cc', 'Bcc') if msg.get(h))
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (id, recipients, subject, message, next_attempt, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (message_id, recipients, str(msg.get('Subject', '')), msg.as_bytes(), now, now, now),
+            )
+            self._conn.commit()
+            added = cur.rowcount == 1
+        if added:
+            metrics.inc('outbox_enqueued')
+            self.new_mail.set()
+        return message_id, added
+
+    def claim(self):
+        """
+        Take the next message that is due and mark it as being sent.
+        A message whose sender stopped without finishing (still 'sending' after
+        `lease_seconds`) counts as due again.
+        Returns (id, EmailMessage, attempts) or None if nothing is due.
+        """
+        with self._lock:
+            while True:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT id, message, attempts, status, updated FROM outbox "
+                    "WHERE (status = 'pending' AND next_attempt <= ?) OR (status = 'sending' AND updated < ?) "
+                    "ORDER BY next_attempt LIMIT 1",
+                    (now, now - self.lease_seconds),
+                ).fetchone()
+                if row is None:
+                    return None
+                # Only take it if no other process claimed it since we looked
+                cur = self._conn.execute(
+                    "UPDATE outbox SET status = 'sending', updated = ? WHERE id = ? AND status = ? AND updated = ?",
+                    (now, row[0], row[3], row[4]),
+                )
+                self._conn.commit()
+                if cur.rowcount == 1:
+                    break
+        if row[3] == 'sending':
+            metrics.inc('outbox_lease_expired')
+        msg = email.message_from_bytes(row[1], policy=email.policy.default)
+        return row[0], msg, row[2]
+
+    def mark_sent(self, message_id):
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET status = 'sent', last_error = NULL, updated = ? WHERE id = ?",
+                               (time.time(), message_id))
+            self._conn.commit()
+        metrics.inc('outbox_sent')
+
+    def mark_failed(self, message_id, error):
+        """Schedule a retry with exponential backoff, or dead-letter the message."""
+        now = time.time()
+        with self._lock:
+            attempts = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?",
+                                          (message_id,)).fetchone()[0] + 1
+            if attempts >= self.max_attempts:
+                status, next_attempt = 'dead', now
+                metrics.inc('outbox_dead')
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                # A little jitter so several failed messages don't all retry at once
+                status, next_attempt = 'pending', now + delay * random.uniform(0.8, 1.2)
+                metrics.inc('outbox_retries')
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ?, updated = ? "
+                "WHERE id = ?",
+                (status, attempts, next_attempt, str(error), now, message_id),
+            )
+            self._conn.commit()
+        return status
+
+    def retry_dead(self):
+        """Put every dead-lettered message back in the queue. Returns how many."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt = ? WHERE status = 'dead'",
+                (time.time(),),
+            )
+            self._conn.commit()
+        if cur.rowcount:
+            self.new_mail.set()
+        return cur.rowcount
+
+    def counts(self):
+        """Return how many messages are in each state, e.g. {'pending': 2, 'sent': 10}."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def dead_letters(self):
+        """Return (id, recipients, subject, attempts, last_error) for every dead-lettered message."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, recipients, subject, attempts, last_error FROM outbox WHERE status = 'dead' "
+                "ORDER BY updated"
+            ).fetchall()
+
+    def next_due(self):
+        """Seconds until the next message is due (None if nothing is pending or being sent)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(CASE WHEN status = 'pending' THEN next_attempt ELSE updated + ? END) FROM outbox "
+                "WHERE status IN ('pending', 'sending')",
+                (self.lease_seconds,),
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def unfinished(self):
+        """Number of messages still waiting to be sent or being sent."""
+        counts = self.counts()
+        return counts.get('pending', 0) + counts.get('sending', 0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxWorkers:
+    """
+    Background threads that deliver messages from a MailOutbox.
+
+    Args:
+        outbox (MailOutbox): Queue to drain
+        send_fn (callable): Sends one EmailMessage and raises on failure
+        workers (int): Number of sending threads
+        poll_interval (float): Longest a worker sleeps before checking for due retries
+    """
+
+    def __init__(self, outbox, send_fn, workers=2, poll_interval=5.0):
+        self.outbox = outbox
+        self.send_fn = send_fn
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Clear before looking so a message queued meanwhile still wakes us up
+            self.outbox.new_mail.clear()
+            job = self.outbox.claim()
+            if job is None:
+                wait = self.outbox.next_due()
+                self.outbox.new_mail.wait(self.poll_interval if wait is None else min(wait, self.poll_interval))
+                continue
+            message_id, msg, attempts = job
+            try:
+                self.send_fn(msg)
+            except Exception as e:
+                status = self.outbox.mark_failed(message_id, e)
+                if status == 'dead':
+                    print(f"❌ Email to {msg['To']} failed {attempts + 1} times and was moved to dead letters: {e}")
+            else:
+                self.outbox.mark_sent(message_id)
+                print(f"🎉 Email sent successfully to {msg['To']}!")
+
+    def wait_until_empty(self, timeout=None):
+        """
+        Block until no message is waiting to be sent right now (retries scheduled
+        for later don't count). Returns True if the outbox emptied in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            counts = self.outbox.counts()
+            due = self.outbox.next_due()
+            if not counts.get('sending') and (due is None or due > 0):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self.outbox.new_mail.set()
+        for thread in self._threads:
+            thread.join(timeout)
@@ -0,0 +1,145 @@
+import hashlib
+import html as _html_module
+import threading
+from collections import OrderedDict
+
+import markdown
+
+# Extensions used for every render: fenced code blocks, tables, and code highlighting
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "codehilite"]
+# Size of the pieces a very large page is rendered in (see MarkdownRenderer.render_stream)
+SEGMENT_CHARS = 256 * 1024
+
+
+class MarkdownRenderer:
+    """
+    Turns Markdown into an HTML fragment with one reusable markdown.Markdown
+    instance, remembering recent outputs by content hash.
+
+    Building the extension stack and re-highlighting a large page is slow, so
+    the same text rendered for the saved file and for the email body is only
+    converted once.
+
+    Args:
+        max_entries (int): How many rendered pages to remember
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        # markdown.Markdown keeps state while converting, so one render at a time
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text):
+        """Return the HTML fragment for `text`, reusing a cached render when possible."""
+        text = text or ""
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            # Falls back to escaping the text inside a <pre> block
+            html_fragment = self._convert(text)
+            self._cache[key] = html_fragment
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return html_fragment
+
+    def _convert(self, text):
+        """Convert without caching (the caller holds the lock)."""
+        try:
+            return self._md.reset().convert(text)
+        except Exception:
+            self._md.reset()
+            return f"<pre>{_html_module.escape(text)}</pre>"
+
+    def render_stream(self, chunks, segment_chars=SEGMENT_CHARS):
+        """
+        Render Markdown arriving in pieces and yield the HTML bit by bit.
+
+        The text is cut into segments of about `segment_chars` characters at
+        blank lines outside fenced code blocks, and each segment is converted
+        on its own, so memory use depends on the segment size rather than on
+        the size of the page. Outputs are not cached.
+
+        Text without blank lines is still cut once a segment reaches twice
+        that size: at the end of a line outside code blocks, or inside one by
+        closing the block and opening it again in the next segment. A single
+        line longer than a segment is broken at a space.
+        """
+        hard_limit = 2 * segment_chars
+        pending = []
+        pending_chars = 0
+        fence = None   # The marker (``` or ~~~) of the code block we are in, if any
+        tail = ""
+        for chunk in chunks:
+            lines = (tail + chunk).split("\n")
+            tail = lines.pop()
+            # Don't let one very long line pile up waiting for its newline
+            while len(tail) > segment_chars:
+                cut = tail.rfind(" ", 0, segment_chars) + 1 or segment_chars
+                lines.append(tail[:cut])
+                tail = tail[cut:]
+            for line in lines:
+                stripped = line.lstrip()
+                if fence is None and stripped.startswith(("```", "~~~")):
+                    fence = stripped[:len(stripped) - len(stripped.lstrip(stripped[0]))]
+                    fence_line = line
+                elif fence is not None and stripped.startswith(fence):
+                    fence = None
+                pending.append(line)
+                pending_chars += len(line) + 1
+                if pending_chars < segment_chars:
+                    continue
+                if fence is None and (not line.strip() or pending_chars >= hard_limit):
+                    reopen = []
+                elif fence is not None and pending_chars >= hard_limit:
+                    pending.append(fence)
+                    reopen = [fence_line]
+                else:
+                    continue
+                with self._lock:
+                    html_fragment = self._convert("\n".join(pending))
+                yield html_fragment
+                pending = reopen
+                pending_chars = sum(len(line) + 1 for line in reopen)
+        pending.append(tail)
+        if any(line.strip() for line in pending):
+            with self._lock:
+                html_fragment = self._convert("\n".join(pending))
+            yield html_fragment
+
+    def clear(self):
+        """Forget every cached render."""
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared renderer used by save_to_html and send_email
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    """Return the shared MarkdownRenderer, creating it on first use."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = MarkdownRenderer()
+        return _renderer
+
+
+def render_markdown(text):
+    """Render Markdown text to an HTML fragment with the shared renderer."""
+    return get_renderer().render(text)
+
+
+def render_markdown_stream(chunks):
+    """Render Markdown given in pieces, yielding HTML pieces (see MarkdownRenderer.render_stream)."""
+    return get_renderer().render_stream(chunks)
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Prefix added to every metric name in the Prometheus output
+PROMETHEUS_PREFIX = "tavilysss_"
+
+
+class Metrics:
+    """
+    Thread-safe counters and timers for the slow stages of the program
+    (Tavily API calls, Markdown rendering, file writes, SMTP connect/login/send).
+
+    Recording a value is a perf_counter() call plus a dict update under a lock,
+    so it is cheap enough to leave on all the time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        # name -> [count, total seconds, slowest call in seconds]
+        self._timers = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1):
+        """Add `value` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one timing."""
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                self._timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Time the code inside the `with` block under `name`.
+        An exception also bumps the `<name>_errors` counter.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors")
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Return every counter and timer as a plain dict."""
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'uptime_seconds': time.time() - self.started,
+                'counters': dict(self._counters),
+                'timers': {name: {'count': count, 'total_seconds': total, 'max_seconds': slowest,
+                                  'mean_seconds': total / count if count else 0.0}
+                           for name, (count, total, slowest) in self._timers.items()},
+            }
+
+    def to_prometheus(self):
+        """Format the metrics in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap['counters'].items()):
+            metric = f"{PROMETHEUS_PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, timer in sorted(snap['timers'].items()):
+            metric = f"{PROMETHEUS_PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {timer['count']}")
+            lines.append(f"{metric}_sum {timer['total_seconds']:.6f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.append(f"{metric}_max {timer['max_seconds']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Export the metrics to `path`.
+        A `.prom` file is overwritten with Prometheus text; anything else gets
+        one JSON line appended (a structured log of each run).
+        """
+        if path.endswith('.prom'):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+
+    def reset(self):
+        """Forget every recorded value."""
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self.started = time.time()
+
+
+# Shared metrics used across the program
+metrics = Metrics()
@@ -0,0 +1,137 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+
+from text_fingerprint import EMPTY_BIN, MINHASH_BINS, minhash, minhash_similarity
+
+# Estimated Jaccard similarity at or above which two pages count as copies
+DUPLICATE_THRESHOLD = 0.7
+# LSH banding: the signature is cut into BANDS bands of ROWS values each.
+# Pages sharing any whole band become candidates, which finds ~99% of pairs
+# at the threshold while checking only a small fraction of stored pages.
+BANDS = 16
+ROWS = MINHASH_BINS // BANDS
+
+
+def band_keys(signature):
+    """One bucket key per band (bands where every bin is empty are skipped)."""
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        if all(v == EMPTY_BIN for v in values):
+            continue
+        digest = hashlib.blake2b(repr((band, values)).encode('ascii'), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+class DuplicateIndex:
+    """
+    Locality-sensitive hashing index of MinHash signatures, stored in SQLite
+    (':memory:' for a throwaway index).
+
+    Looking a page up only compares it with pages that share an LSH bucket,
+    so it stays fast with thousands of stored pages.
+
+    Args:
+        path (str): Location of the SQLite database file, or ':memory:'
+        threshold (float): Similarity at or above which pages are duplicates
+    """
+
+    def __init__(self, path=':memory:', threshold=DUPLICATE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                url TEXT,
+                title TEXT,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                page_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets(bucket);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, signature, url=None, title=None):
+        """Store a page's signature and return its id."""
+        blob = array('Q', signature).tobytes()
+        with self._lock:
+            cur = self._conn.execute("INSERT INTO pages (url, title, signature) VALUES (?, ?, ?)",
+                                     (url, title, blob))
+            page_id = cur.lastrowid
+            self._conn.executemany("INSERT INTO buckets (bucket, page_id) VALUES (?, ?)",
+                                   [(key, page_id) for key in band_keys(signature)])
+            self._conn.commit()
+        return page_id
+
+    def find(self, signature):
+        """
+        Return stored pages similar to `signature`, most similar first,
+        as dicts with 'id', 'url', 'title' and 'similarity'.
+        """
+        keys = band_keys(signature)
+        if not keys:
+            return []
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, url, title, signature FROM pages WHERE id IN "
+                f"(SELECT DISTINCT page_id FROM buckets WHERE bucket IN ({placeholders}))",
+                keys,
+            ).fetchall()
+        matches = []
+        for page_id, url, title, blob in rows:
+            similarity = minhash_similarity(signature, array('Q', blob))
+            if similarity >= self.threshold:
+                matches.append({'id': page_id, 'url': url, 'title': title, 'similarity': similarity})
+        matches.sort(key=lambda m: m['similarity'], reverse=True)
+        return matches
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def collapse_duplicates(results, saved_index=None, threshold=DUPLICATE_THRESHOLD):
+    """
+    Merge near-duplicate results (e.g. the same article syndicated on several sites).
+
+    Within `results` the best-ranked copy is kept and the other copies' URLs are
+    listed in its 'alternate_urls'. When `saved_index` is given, results that
+    match an already saved page get 'duplicate_of' set to that page's details.
+
+    Returns a new list; the input results are not modified.
+    """
+    local = DuplicateIndex(threshold=threshold)
+    kept = []
+    by_page_id = {}
+    for result in results:
+        content = result.get('raw_content', '') or result.get('content', '')
+        signature = minhash(content)
+        matches = local.find(signature)
+        if matches:
+            original = by_page_id[matches[0]['id']]
+            original.setdefault('alternate_urls', []).append(result.get('url'))
+            continue
+        entry = dict(result)
+        if saved_index is not None:
+            saved = saved_index.find(signature)
+            if saved:
+                entry['duplicate_of'] = saved[0]
+        by_page_id[local.add(signature, result.get('url'), result.get('title'))] = entry
+        kept.append(entry)
+    local.close()
+    return kept
@@ -0,0 +1,290 @@
+import copy
+import datetime
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from metrics import metrics  # Throttling and retry counters
+
+# Default pace for Tavily calls: a steady rate plus a short burst allowance
+DEFAULT_RATE_PER_SECOND = 2.0
+DEFAULT_BURST = 5
+# Retries for a call that failed with 429, a 5xx or a timeout
+MAX_RETRIES = 4
+# First wait after such a failure (doubles each time, with jitter)
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every thread.
+
+    Each call takes one token; tokens refill at `rate` per second up to
+    `capacity`. The rate adapts: slow_down() halves it after the API pushes
+    back, and every success wins a little of it back (up to the configured
+    rate), so bursts settle at whatever pace the plan actually allows.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (int): Most tokens saved up for a burst
+        min_rate (float): Lowest the rate drops to after repeated slow_down()
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_PER_SECOND, capacity=DEFAULT_BURST, min_rate=0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min(min_rate, rate)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take a token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def slow_down(self):
+        """Halve the rate and drop any saved-up burst (the API said we're going too fast)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def speed_up(self):
+        """Win back some of the rate after a successful call."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+class SingleFlight:
+    """
+    Makes identical calls that overlap share one execution: the first caller
+    runs the function and everyone else asking for the same key meanwhile
+    waits for, and gets, the same result (or exception).
+
+    Each waiter gets its own deep copy of the result, since callers are free
+    to modify what they get back (search_agent pops the results list).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> dict with 'done', 'waiters', 'copies', 'error'
+
+    def do(self, key, fn):
+        """Run `fn()` for `key`, or wait for the call already running for it. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'waiters': 0, 'copies': [], 'error': None}
+            else:
+                call['waiters'] += 1
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            with self._lock:
+                return call['copies'].pop(), True
+        result = None
+        try:
+            result = fn()
+            return result, False
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                # No one can join once the key is gone, so the waiter count is final
+                del self._calls[key]
+            if call['error'] is None:
+                call['copies'] = [copy.deepcopy(result) for _ in range(call['waiters'])]
+            call['done'].set()
+
+
+class UsageTracker:
+    """
+    Counts Tavily calls and estimated API credits per API key and month, in a
+    SQLite file. Keys are stored as a short hash, never in full.
+
+    Credits follow Tavily's published pricing: a basic search costs 1, an
+    advanced search 2, and extract costs 1 (basic) or 2 (advanced) per 5 URLs.
+
+    Args:
+        path (str): Location of the SQLite database file
+        monthly_credits (int): Credits in the plan (0 = unknown, no warnings)
+    """
+
+    def __init__(self, path, monthly_credits=0):
+        self.path = path
+        self.monthly_credits = monthly_credits
+        self._warned = False
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS usage (
+                   key_id TEXT NOT NULL,
+                   month TEXT NOT NULL,
+                   calls INTEGER NOT NULL DEFAULT 0,
+                   credits REAL NOT NULL DEFAULT 0,
+                   throttled INTEGER NOT NULL DEFAULT 0,
+                   failures INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (key_id, month)
+               )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key_id(api_key):
+        return hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def credits_for(endpoint, params, urls=0):
+        advanced = params.get('search_depth', params.get('extract_depth')) == "advanced"
+        if endpoint == 'extract':
+            return (2 if advanced else 1) * max(1, -(-urls // 5))
+        return 2 if advanced else 1
+
+    def record(self, key_id, calls=0, credits=0, throttled=0, failures=0):
+        month = datetime.date.today().strftime('%Y-%m')
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO usage (key_id, month, calls, credits, throttled, failures) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key_id, month) DO UPDATE SET calls = calls + excluded.calls, "
+                "credits = credits + excluded.credits, throttled = throttled + excluded.throttled, "
+                "failures = failures + excluded.failures",
+                (key_id, month, calls, credits, throttled, failures),
+            )
+            self._conn.commit()
+            used = self._conn.execute("SELECT credits FROM usage WHERE key_id = ? AND month = ?",
+                                      (key_id, month)).fetchone()[0]
+        if self.monthly_credits and not self._warned and used >= 0.9 * self.monthly_credits:
+            self._warned = True
+            print(f"⚠️ About {used:g} of {self.monthly_credits} Tavily credits used this month.")
+
+    def usage(self):
+        """Return one dict per key and month, newest month first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key_id, month, calls, credits, throttled, failures FROM usage ORDER BY month DESC, key_id"
+            ).fetchall()
+        return [{'key_id': k, 'month': m, 'calls': c, 'credits': cr, 'throttled': t, 'failures': f}
+                for k, m, c, cr, t, f in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def retry_reason(error):
+    """Why a failed call is worth retrying ('429', '5xx', 'timeout'), or None if it isn't."""
+    name = type(error).__name__
+    if name == 'UsageLimitExceededError':
+        return '429'
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status == 429:
+        return '429'
+    if status is not None and status >= 500:
+        return '5xx'
+    if name in ('TimeoutError', 'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout'):
+        return 'timeout'
+    return None
+
+
+class ThrottledClient:
+    """
+    Wraps a TavilyClient with request coalescing, pacing and retries.
+
+    - Identical search/extract calls running at the same time share one API call.
+    - Every API call takes a token from a TokenBucket first.
+    - A 429, 5xx or timeout is retried with exponential backoff and jitter;
+      a 429 also halves the bucket's rate until calls succeed again.
+    - Calls and estimated credits are recorded per API key (see UsageTracker).
+
+    Anything else (e.g. a bad API key) is raised straight away.
+
+    Args:
+        client (TavilyClient): The real client
+        bucket (TokenBucket): Rate limiter (a default one if None)
+        usage (UsageTracker): Where to record quota use (optional)
+        api_key (str): Key the calls are billed to (used for the usage records)
+        max_retries (int): Retries after a 429/5xx/timeout
+    """
+
+    def __init__(self, client, bucket=None, usage=None, api_key=None, max_retries=MAX_RETRIES):
+        self.client = client
+        self.bucket = bucket or TokenBucket()
+        self.usage = usage
+        self.key_id = UsageTracker.key_id(api_key or getattr(client, 'api_key', ''))
+        self.max_retries = max_retries
+        self._flights = SingleFlight()
+
+    def _call(self, endpoint, fn, credits):
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            if waited:
+                metrics.observe('tavily_throttle_wait', waited)
+            try:
+                result = fn()
+            except Exception as e:
+                reason = retry_reason(e)
+                if self.usage is not None:
+                    self.usage.record(self.key_id, throttled=int(reason == '429'), failures=1)
+                if reason is None or attempt >= self.max_retries:
+                    raise
+                if reason == '429':
+                    self.bucket.slow_down()
+                metrics.inc(f'tavily_retries_{reason}')
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"⏳ Tavily {endpoint} call failed ({reason}); retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.bucket.speed_up()
+            if self.usage is not None:
+                self.usage.record(self.key_id, calls=1, credits=credits)
+            return result
+
+    def _coalesced(self, endpoint, key_data, fn, credits):
+        key = json.dumps([endpoint, key_data], sort_keys=True, default=str)
+        result, shared = self._flights.do(key, lambda: self._call(endpoint, fn, credits))
+        if shared:
+            metrics.inc('tavily_coalesced')
+        return result
+
+    def search(self, query, **params):
+        """Same as TavilyClient.search."""
+        return self._coalesced('search', [query, params],
+                               lambda: self.client.search(query=query, **params),
+                               UsageTracker.credits_for('search', params))
+
+    def extract(self, urls, **params):
+        """Same as TavilyClient.extract."""
+        url_list = [urls] if isinstance(urls, str) else list(urls)
+        return self._coalesced('extract', [url_list, params],
+                               lambda: self.client.extract(urls=url_list, **params),
+                               UsageTracker.credits_for('extract', params, len(url_list)))
+
+    def __getattr__(self, name):
+        # Anything else (crawl, map, ...) goes to the real client unchanged
+        return getattr(self.client, name)
@@ -0,0 +1,181 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+# Columns of every exported row, in order
+EXPORT_FIELDS = ['query', 'rank', 'title', 'url', 'score', 'content', 'raw_content', 'searched_at']
+MANIFEST_VERSION = 1
+# A lock file older than this was left by a process that died while writing
+LOCK_STALE_SECONDS = 30
+
+
+class ResultExporter:
+    """
+    Append-only archive of search results for analysis outside the app.
+
+    Rows (one per result, see EXPORT_FIELDS) go into gzip-compressed JSON
+    Lines files, one file per month (results-YYYY-MM.jsonl.gz). Each append
+    adds a new gzip member to the end of the file, so nothing already written
+    is ever rewritten. Rows are compressed one at a time, so only one
+    result's text is held uncompressed at once, and before any lock is taken, so
+    concurrent searches only wait for each other to append the bytes.
+
+    A search that skipped the page bodies (lazy mode) archives them later with
+    append_body(): a second row for the same query, rank and URL, this time
+    with raw_content filled in. manifest.json lists every file with its row and query
+    counts and time range, and is replaced atomically after each append.
+    Appends hold a lock file in the folder, so several processes (the window,
+    the CLI, the service) can share one archive without losing rows or
+    manifest entries.
+
+    Args:
+        folder (str): Where the archive lives (created if missing)
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.manifest_path = os.path.join(folder, 'manifest.json')
+        self.lock_path = os.path.join(folder, '.lock')
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the archive for this thread and process (a lock file works on every OS)."""
+        with self._lock:
+            while True:
+                try:
+                    fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    try:
+                        if time.time() - os.path.getmtime(self.lock_path) > LOCK_STALE_SECONDS:
+                            os.remove(self.lock_path)
+                            continue
+                    except OSError:
+                        continue  # Released meanwhile
+                    time.sleep(0.01)
+            try:
+                yield
+            finally:
+                os.close(fd)
+                os.remove(self.lock_path)
+
+    def manifest(self):
+        """Return the manifest dict (an empty one if nothing was exported yet)."""
+        if not os.path.exists(self.manifest_path):
+            return {'format': 'jsonl.gz', 'version': MANIFEST_VERSION, 'fields': EXPORT_FIELDS, 'segments': []}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def append(self, query, results, searched_at=None):
+        """
+        Add one query's results to the archive. Returns the number of rows written.
+
+        Args:
+            query (str): The search query
+            results (list): Result dicts from the Tavily response
+            searched_at (datetime): When the search ran (defaults to now)
+        """
+        return self._write(query, list(enumerate(results, 1)), searched_at, new_query=True)
+
+    def append_body(self, query, rank, result, searched_at=None):
+        """
+        Archive the page body of one result that was fetched after its search.
+        Returns the number of rows written (0 if it has no body).
+
+        Args:
+            query (str): The search query the result came from
+            rank (int): The result's position in that search
+            result (dict): The result with 'raw_content' filled in
+            searched_at (datetime): When the body was fetched (defaults to now)
+        """
+        if not isinstance(result.get('raw_content'), str) or not result['raw_content']:
+            return 0
+        return self._write(query, [(rank, result)], searched_at, new_query=False)
+
+    def _write(self, query, ranked, searched_at, new_query):
+        if not ranked:
+            return 0
+        searched_at = (searched_at or datetime.datetime.now()).isoformat(timespec='seconds')
+        name = f"results-{searched_at[:7]}.jsonl.gz"
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as out:
+            for rank, result in ranked:
+                raw = result.get('raw_content')
+                row = {
+                    'query': query,
+                    'rank': rank,
+                    'title': result.get('title'),
+                    'url': result.get('url'),
+                    'score': result.get('score'),
+                    'content': result.get('content'),
+                    'raw_content': raw if isinstance(raw, str) else None,
+                    'searched_at': searched_at,
+                }
+                out.write((json.dumps(row, ensure_ascii=False) + "\n").encode('utf-8'))
+        data = buffer.getbuffer()
+        written = len(data)
+
+        with self._locked():
+            # No fsync: a crash can only cut off the last member, which read_segment skips
+            with open(os.path.join(self.folder, name), 'ab') as f:
+                f.write(data)
+            manifest = self.manifest()
+            segment = next((s for s in manifest['segments'] if s['file'] == name), None)
+            if segment is None:
+                segment = {'file': name, 'rows': 0, 'queries': 0, 'bytes': 0,
+                           'first_searched_at': searched_at, 'last_searched_at': searched_at}
+                manifest['segments'].append(segment)
+            segment['rows'] += len(ranked)
+            segment['queries'] += int(new_query)
+            segment['bytes'] += written
+            segment['first_searched_at'] = min(segment['first_searched_at'], searched_at)
+            segment['last_searched_at'] = max(segment['last_searched_at'], searched_at)
+            self._write_manifest(manifest)
+        return len(ranked)
+
+    def read(self, query=None, since=None, fields=None):
+        """
+        Yield exported rows one at a time, oldest file first.
+
+        Args:
+            query (str): Only rows for this exact query
+            since (str): Only rows searched at or after this ISO date/time
+            fields (list): Keep only these keys of each row
+        """
+        for segment in self.manifest()['segments']:
+            if since and segment['last_searched_at'] < since:
+                continue  # The whole file is older than asked for
+            for row in read_segment(os.path.join(self.folder, segment['file'])):
+                if query is not None and row['query'] != query:
+                    continue
+                if since and row['searched_at'] < since:
+                    continue
+                yield {k: row.get(k) for k in fields} if fields else row
+
+
+def read_segment(path):
+    """
+    Yield the rows of one archive file. A write cut off by a crash can leave
+    an incomplete gzip member at the end; the rows before it are still returned.
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError):
+        return
@@ -0,0 +1,102 @@
+import datetime
+import sqlite3
+import threading
+
+
+class ResultIndex:
+    """
+    Full-text index of every saved result, stored in a SQLite file (FTS5).
+
+    Each save adds one row, so the index never has to rescan the saved_html
+    folder. Lookups by keyword or by URL answer "have we seen this before?"
+    without running another paid search.
+
+    Args:
+        path (str): Location of the SQLite database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS saved (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                title TEXT,
+                url TEXT,
+                query TEXT,
+                saved_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS saved_url ON saved(url);
+            CREATE VIRTUAL TABLE IF NOT EXISTS saved_text USING fts5(title, url, query, content);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, path, title, url, content, query=None, saved_at=None):
+        """Index one saved result and return its id. `path` is the save id (or a page path in older indexes)."""
+        saved_at = saved_at or datetime.datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO saved (path, title, url, query, saved_at) VALUES (?, ?, ?, ?, ?)",
+                (path, title, url, query, saved_at),
+            )
+            row_id = cur.lastrowid
+            # The text row shares its rowid with the `saved` row
+            self._conn.execute(
+                "INSERT INTO saved_text (rowid, title, url, query, content) VALUES (?, ?, ?, ?, ?)",
+                (row_id, title or "", url or "", query or "", content or ""),
+            )
+            self._conn.commit()
+        return row_id
+
+    def search(self, text, limit=10):
+        """
+        Full-text search over title, URL, query and content, best matches first.
+        `text` uses SQLite FTS5 query syntax; plain words match pages containing all of them.
+        """
+        sql = ("SELECT s.id, s.path, s.title, s.url, s.query, s.saved_at, "
+               "snippet(saved_text, 3, '[', ']', '...', 12) "
+               "FROM saved_text JOIN saved s ON s.id = saved_text.rowid "
+               "WHERE saved_text MATCH ? ORDER BY rank LIMIT ?")
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, (text, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid FTS5 syntax (e.g. stray quotes) - search for it as one phrase
+                phrase = '"' + text.replace('"', '""') + '"'
+                rows = self._conn.execute(sql, (phrase, limit)).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def find_url(self, url):
+        """Return every saved copy of `url`, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, path, title, url, query, saved_at, '' FROM saved "
+                "WHERE url = ? ORDER BY id DESC",
+                (url,),
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def remove_path(self, path):
+        """Drop the entries for a saved file (e.g. after deleting it)."""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM saved WHERE path = ?", (path,))]
+            self._conn.executemany("DELETE FROM saved_text WHERE rowid = ?", [(i,) for i in ids])
+            self._conn.execute("DELETE FROM saved WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM saved").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_dict(row):
+        return {'id': row[0], 'path': row[1], 'title': row[2], 'url': row[3],
+                'query': row[4], 'saved_at': row[5], 'snippet': row[6]}
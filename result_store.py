@@ -0,0 +1,285 @@
+import datetime
+import gzip
+import hashlib
+import html as _html_module
+import json
+import os
+import threading
+
+# Stylesheet shared by every saved page (written once as style.css)
+PAGE_CSS = """body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+    color: #111;
+    line-height: 1.6;
+    padding: 20px;
+    max-width: 900px;
+    margin: 0 auto;
+    background: #f5f5f5;
+}
+.container {
+    background: white;
+    padding: 30px;
+    border-radius: 8px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+}
+h1 {
+    color: #222;
+    margin-top: 0;
+    border-bottom: 3px solid #007acc;
+    padding-bottom: 10px;
+}
+.metadata {
+    background: #f0f4f8;
+    padding: 15px;
+    border-radius: 4px;
+    margin: 20px 0;
+    border-left: 4px solid #007acc;
+}
+.metadata p {
+    margin: 5px 0;
+}
+.metadata strong {
+    color: #007acc;
+}
+.source-url {
+    word-break: break-all;
+    font-family: 'Courier New', monospace;
+    font-size: 12px;
+}
+.content {
+    margin-top: 30px;
+    line-height: 1.8;
+    word-break: break-word;
+    overflow-wrap: anywhere;
+    white-space: pre-line;
+    max-width: 100%;
+}
+.timestamp {
+    text-align: right;
+    color: #999;
+    font-size: 12px;
+    margin-top: 40px;
+    border-top: 1px solid #eee;
+    padding-top: 10px;
+}
+"""
+
+# Layout of a saved page. The body comes from the compressed object store.
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="stylesheet" href="{stylesheet}">
+</head>
+<body>
+    <div class="container">
+        <h1>{title}</h1>
+        <div class="metadata">
+            <p><strong>Source URL:</strong></p>
+            <p class="source-url"><a href="{url}" target="_blank">{url}</a></p>
+            <p><strong>Content Length:</strong> {content_length} characters</p>
+        </div>
+        <div class="content">
+    {body}
+        </div>
+        <div class="timestamp">
+            Saved on {saved_on}
+        </div>
+    </div>
+</body>
+</html>"""
+
+
+class ResultStore:
+    """
+    Content-addressed storage for saved results.
+
+    Each rendered page body is gzip-compressed and stored once under its
+    SHA-256 hash in objects/ab/cd/<hash>.html.gz, so saving the same page
+    again costs only one line in saves.jsonl. The stylesheet lives in a single
+    style.css. Readable HTML views are a cache written to views/ab/cd/<hash>.html
+    when a result is opened - one per stored body, however often it was saved.
+
+    Args:
+        root (str): Folder that holds the store (created if missing)
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.views_dir = os.path.join(root, 'views')
+        self.saves_file = os.path.join(root, 'saves.jsonl')
+        self._lock = threading.Lock()
+        # saves.jsonl read so far, indexed by save id and by body hash (latest save)
+        self._by_id = {}
+        self._by_key = {}
+        self._read_offset = 0
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.views_dir, exist_ok=True)
+        stylesheet = os.path.join(root, 'style.css')
+        if not os.path.exists(stylesheet):
+            with open(stylesheet, 'w', encoding='utf-8') as f:
+                f.write(PAGE_CSS)
+
+    def object_path(self, key):
+        """Where the compressed body with hash `key` lives (two levels of shard folders)."""
+        return os.path.join(self.objects_dir, key[:2], key[2:4], f"{key}.html.gz")
+
+    def put_body(self, body):
+        """
+        Store an HTML body fragment and return its hash.
+        `body` can be a string or an iterable of string pieces; pieces are
+        hashed and compressed as they arrive, so a huge body is never held whole.
+        Nothing is kept if the same body is already stored.
+        Returns (key, bytes written).
+        """
+        if isinstance(body, str):
+            key = hashlib.sha256(body.encode('utf-8')).hexdigest()
+            if os.path.exists(self.object_path(key)):
+                return key, 0
+            pieces = [body]
+        else:
+            pieces = body
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # Write to a temporary name first so a crash never leaves half an object
+        tmp_path = os.path.join(self.objects_dir, f"incoming.{os.getpid()}.{threading.get_ident()}.tmp")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as f:
+                for piece in pieces:
+                    data = piece.encode('utf-8')
+                    digest.update(data)
+                    f.write(data)
+            key = digest.hexdigest()
+            path = self.object_path(key)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                return key, 0
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            written = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            return key, written
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_body(self, key):
+        """Return the stored HTML body fragment for `key`."""
+        with gzip.open(self.object_path(key), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def iter_body(self, key, chunk_chars=256 * 1024):
+        """Yield the stored HTML body fragment for `key` in pieces."""
+        with gzip.open(self.object_path(key), 'rt', encoding='utf-8') as f:
+            while True:
+                piece = f.read(chunk_chars)
+                if not piece:
+                    return
+                yield piece
+
+    def save(self, body, title, url, content_length):
+        """
+        Store a result and record this save.
+        Returns the save record (a dict with 'id', 'key', 'title', 'url', ...).
+        """
+        key, written = self.put_body(body)
+        now = datetime.datetime.now()
+        record = {
+            # Microseconds plus the body hash keep ids unique even for saves in the same second
+            'id': f"{now.strftime('%Y%m%d_%H%M%S_%f')}_{key[:8]}",
+            'key': key,
+            'title': title,
+            'url': url,
+            'content_length': content_length,
+            'saved_at': now.isoformat(timespec='seconds'),
+            'bytes_written': written,
+        }
+        with self._lock, open(self.saves_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+
+    def records(self):
+        """Yield every save record, oldest first."""
+        if not os.path.exists(self.saves_file):
+            return
+        with open(self.saves_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _refresh(self):
+        """Index the saves.jsonl lines added since the last call (by this or another process)."""
+        if not os.path.exists(self.saves_file):
+            return
+        with open(self.saves_file, 'rb') as f:
+            f.seek(self._read_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written; picked up next time
+                self._read_offset += len(line)
+                if line.strip():
+                    record = json.loads(line)
+                    self._by_id[record['id']] = record
+                    self._by_key[record['key']] = record
+
+    def find(self, save_id):
+        """
+        Return the save record with this id, or None. A body hash is accepted
+        too and gives the latest save of that body.
+        """
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(save_id) or self._by_key.get(save_id)
+
+    def view_path(self, key):
+        """Where the readable HTML view of the body with hash `key` is cached (sharded like objects)."""
+        return os.path.join(self.views_dir, key[:2], key[2:4], f"{key}.html")
+
+    def write_view(self, record):
+        """
+        Write the readable HTML page for a save record and return its path.
+        The body is copied from the store in pieces, straight into the file.
+        Nothing is written if the view already shows this save.
+        """
+        path = self.view_path(record['key'])
+        marker = f"<!-- save {record['id']} -->\n"
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                if f.readline() == marker:
+                    return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        escape = _html_module.escape
+        saved_on = datetime.datetime.fromisoformat(record['saved_at']).strftime('%Y-%m-%d %H:%M:%S')
+        # Fill in everything but the body, then split the page around it
+        page = PAGE_TEMPLATE.format(
+            title=escape(record['title'] or ""),
+            stylesheet="../../../style.css",
+            url=escape(record['url'] or ""),
+            content_length=record['content_length'],
+            body="\0",
+            saved_on=saved_on,
+        )
+        # (only the date follows the body, so the last marker is the right one)
+        before_body, after_body = page.rsplit("\0", 1)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(marker)
+            f.write(before_body)
+            for piece in self.iter_body(record['key']):
+                f.write(piece)
+            f.write(after_body)
+        os.replace(tmp_path, path)
+        return path
+
+    def ensure_view(self, save_id):
+        """
+        Return the path of a save's HTML view (by save id or body hash),
+        writing it first if needed. Returns None if nothing matches.
+        """
+        record = self.find(save_id)
+        if record is None:
+            return None
+        return self.write_view(record)
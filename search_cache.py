@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class SearchCache:
+    """
+    On-disk cache of Tavily search responses, stored in a SQLite file.
+
+    Entries are keyed by the query plus the search parameters, expire after
+    `ttl` seconds, and the least recently used entries are removed once the
+    cache holds more than `max_entries` responses. Responses are stored
+    zlib-compressed and encoded a piece at a time, so caching a response full
+    of page bodies doesn't hold a second full copy of it in memory.
+
+    Args:
+        path (str): Location of the SQLite database file
+        ttl (float): Seconds a cached response stays valid
+        max_entries (int): Most responses kept before old ones are evicted
+    """
+
+    def __init__(self, path, ttl=6 * 60 * 60, max_entries=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # One connection shared by every thread, guarded by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   query TEXT NOT NULL,
+                   response TEXT NOT NULL,
+                   created REAL NOT NULL,
+                   last_used REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(query, **params):
+        """Build a cache key from the query text and the search parameters."""
+        raw = json.dumps({'query': query.strip(), 'params': params}, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, query, **params):
+        """Return the cached response dict, or None if missing or expired."""
+        key = self.make_key(query, **params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, created = row
+            if now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        # Entries written before compression was added are plain JSON text
+        return json.loads(zlib.decompress(data) if isinstance(data, bytes) else data)
+
+    def set(self, query, response, **params):
+        """Store a response and evict the least recently used entries if the cache is full."""
+        key = self.make_key(query, **params)
+        compressor = zlib.compressobj(6)
+        parts = [compressor.compress(piece.encode('utf-8')) for piece in json.JSONEncoder().iterencode(response)]
+        parts.append(compressor.flush())
+        data = b"".join(parts)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, query, response, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, query, data, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Delete every expired entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+    def clear(self):
+        """Delete every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
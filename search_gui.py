@@ -0,0 +1,280 @@
+import os
+import sys
+import queue
+import threading
+from collections import deque
+import tkinter as tk
+from tkinter import scrolledtext
+
+# --- 2. GUI CLASS FOR SEARCH INTERFACE ---
+
+# How often (in milliseconds) queued output is drawn into the text display
+GUI_REFRESH_MS = 50
+# Most characters inserted per refresh, so one huge print can't freeze the window
+GUI_MAX_CHARS_PER_REFRESH = 64 * 1024
+# Most lines kept in the text display before the oldest ones are removed
+GUI_MAX_SCROLLBACK_LINES = 5000
+# Most characters waiting to be drawn; beyond this the oldest waiting text is skipped
+# (about four screens of scrollback at 50 characters a line - it would be trimmed away anyway)
+GUI_MAX_PENDING_CHARS = GUI_MAX_SCROLLBACK_LINES * 200
+
+class SearchGUI:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("TavilySSS")
+        self.root.geometry("700x700")
+        self.root.resizable(True, True)
+        
+        # Store user input from the entry field
+        self.user_input = None
+        self.input_event = threading.Event()
+
+        # Text written from any thread waits here until the main loop draws it
+        self.output_queue = queue.Queue()
+        # Chunks taken off the queue but not drawn yet; the first one is drawn from _pending_offset on
+        self._pending_output = deque()
+        self._pending_offset = 0
+        self._pending_chars = 0   # Characters in _pending_output not drawn yet
+        self.quit_requested = False
+        
+        # --- Title field at top ---
+        title_frame = tk.Frame(root, bg="#007acc", height=50)
+        title_frame.pack(fill=tk.X)
+        title_label = tk.Label(
+            title_frame,
+            text="Tavily Search, Save, Send",
+            font=("Arial", 18, "bold"),
+            bg="#007acc",
+            fg="white",
+            pady=10
+        )
+        title_label.pack()
+        
+        # --- Scrolling text display in middle ---
+        self.text_display = scrolledtext.ScrolledText(
+            root,
+            wrap=tk.WORD,
+            font=("Courier", 9),
+            bg="#6e6e6e",
+            fg="#111"
+        )
+        self.text_display.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.text_display.config(state=tk.DISABLED)
+        
+        # --- Input frame at bottom ---
+        input_frame = tk.Frame(root)
+        input_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.input_field = tk.Entry(input_frame, font=("Arial", 10))
+        self.input_field.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+        self.input_field.bind("<Return>", lambda e: self.submit_input())
+        
+        submit_button = tk.Button(
+            input_frame,
+            text="Enter",
+            font=("Arial", 10),
+            bg="#007acc",
+            fg="white",
+            command=self.submit_input,
+            width=8
+        )
+        submit_button.pack(side=tk.RIGHT)
+    
+        # Start drawing queued output from the Tk main loop
+        self.root.after(GUI_REFRESH_MS, self._drain_output)
+    
+    def append_text(self, text):
+        """
+        Queue text to be added to the scrolled text display.
+        Safe to call from any thread - the main loop draws it in batches.
+        """
+        self.output_queue.put(text)
+    
+    def request_quit(self):
+        """Ask the main loop to close the window (safe to call from any thread)."""
+        self.quit_requested = True
+    
+    def _drain_output(self):
+        """
+        Runs on the Tk main loop every GUI_REFRESH_MS milliseconds.
+        Draws up to GUI_MAX_CHARS_PER_REFRESH characters of queued output in one
+        insert; the rest waits for the next run. Only the characters drawn now
+        are copied, so a huge backlog costs no more per run than a small one.
+        When more than GUI_MAX_PENDING_CHARS are waiting, the oldest are
+        skipped with a note, so a huge print doesn't pile up in memory.
+        """
+        try:
+            while True:
+                chunk = self.output_queue.get_nowait()
+                self._pending_output.append(chunk)
+                self._pending_chars += len(chunk)
+        except queue.Empty:
+            pass
+        if self._pending_chars > GUI_MAX_PENDING_CHARS:
+            self._skip_pending(self._pending_chars - GUI_MAX_PENDING_CHARS)
+        pieces = []
+        room = GUI_MAX_CHARS_PER_REFRESH
+        while room > 0 and self._pending_output:
+            chunk = self._pending_output[0]
+            piece = chunk[self._pending_offset:self._pending_offset + room]
+            pieces.append(piece)
+            room -= len(piece)
+            self._pending_chars -= len(piece)
+            self._pending_offset += len(piece)
+            if self._pending_offset >= len(chunk):
+                self._pending_output.popleft()
+                self._pending_offset = 0
+        text = "".join(pieces)
+        
+        if text:
+            self.text_display.config(state=tk.NORMAL)
+            self.text_display.insert(tk.END, text)
+            self._trim_scrollback()
+            self.text_display.see(tk.END)
+            self.text_display.config(state=tk.DISABLED)
+        
+        if self.quit_requested and not self._pending_output and self.output_queue.empty():
+            self.root.quit()
+            return
+        self.root.after(GUI_REFRESH_MS, self._drain_output)
+    
+    def _skip_pending(self, count):
+        """Drop the oldest `count` waiting characters and put a note in their place."""
+        skipped = 0
+        while skipped < count and self._pending_output:
+            chunk = self._pending_output[0]
+            left = len(chunk) - self._pending_offset
+            if left <= count - skipped:
+                self._pending_output.popleft()
+                self._pending_offset = 0
+                skipped += left
+            else:
+                # Keep the rest of this chunk as a chunk of its own, so the note can go in front
+                self._pending_output[0] = chunk[self._pending_offset + count - skipped:]
+                self._pending_offset = 0
+                skipped = count
+        self._pending_chars -= skipped
+        note = f"\n[... {skipped} characters of output skipped ...]\n"
+        self._pending_output.appendleft(note)
+        self._pending_chars += len(note)
+    
+    def _trim_scrollback(self):
+        """Remove the oldest lines once the display holds more than GUI_MAX_SCROLLBACK_LINES."""
+        line_count = int(self.text_display.index('end-1c').split('.')[0])
+        extra = line_count - GUI_MAX_SCROLLBACK_LINES
+        if extra > 0:
+            self.text_display.delete('1.0', f'{extra + 1}.0')
+    
+    def submit_input(self):
+        """Called when user clicks Enter button or presses Return key."""
+        self.user_input = self.input_field.get()
+        self.input_field.delete(0, tk.END)
+        self.input_event.set()
+    
+    def get_input(self, prompt=""):
+        """Replaces the built-in input() function."""
+        self.append_text(prompt)
+        self.input_event.clear()
+        self.user_input = None
+        
+        # Wait for user to submit input (the main loop keeps the window responsive)
+        while not self.user_input:
+            self.input_event.wait(timeout=0.1)
+        
+        result = self.user_input
+        self.append_text(result + "\n")
+        return result
+
+# --- Redirect print() and input() to GUI ---
+gui_instance = None
+
+def setup_gui_redirection(gui):
+    """Redirect print and input to GUI."""
+    global gui_instance
+    gui_instance = gui
+    
+    # Redirect input() calls
+    import builtins
+    original_input = builtins.input
+    
+    def gui_input(prompt=""):
+        if gui_instance:
+            return gui_instance.get_input(prompt)
+        else:
+            return original_input(prompt)
+    
+    builtins.input = gui_input
+    
+    # Redirect print() to GUI
+    original_stdout = sys.stdout
+    
+    class GUIStdout:
+        def __init__(self):
+            self.buffer = ""
+        
+        def write(self, text):
+            if gui_instance:
+                gui_instance.append_text(text)
+            else:
+                original_stdout.write(text)
+            return len(text)
+        
+        def flush(self):
+            pass
+    
+    sys.stdout = GUIStdout()
+
+
+def run_gui(search_fn, lookup_fn=None):
+    """
+    Build the Tk window and run the interactive search loop until the user quits.
+
+    Args:
+        search_fn (callable): Called with each query typed in (e.g. search_agent)
+        lookup_fn (callable): Called with the rest of a "seen ..." query to look
+            through saved results instead of searching (optional)
+    """
+    root = tk.Tk()
+    gui = SearchGUI(root)
+    setup_gui_redirection(gui)
+    
+    gui.append_text("=" * 60 + "\n")
+    gui.append_text("🤖 TAVILY Research Document Creator\n")
+    gui.append_text("=" * 60 + "\n\n")
+    
+    # Debug: Check if API key is loaded
+    api_key = os.environ.get('TAVILY_API_KEY')
+    if api_key:
+        gui.append_text(f"✅ API Key loaded: {api_key[:10]}...\n\n" if len(api_key) > 10 else "✅ API Key loaded\n\n")
+    else:
+        gui.append_text("❌ No API key found in environment variables\n")
+        gui.append_text("\n🔍 Debugging Info:\n")
+        gui.append_text(f"   Current directory: {os.getcwd()}\n")
+        gui.append_text(f"   .env file exists: {os.path.exists('.env')}\n")
+        if os.path.exists('.env'):
+            gui.append_text("\n   Contents of .env file:\n")
+            with open('.env', 'r') as f:
+                for line in f:
+                    if 'TAVILY' in line:
+                        gui.append_text(f"   {line.strip()}\n")
+    
+    # Run the search loop in a separate thread so the GUI remains responsive
+    def run_search_loop():
+        repeat_search = True
+        while repeat_search:
+            query = input("\nEnter a search query (or 'seen <words>' to check saved results, 'quit' to exit): ").strip()
+            if query.lower() == "quit":
+                repeat_search = False
+                gui.append_text("\n👋 Goodbye!\n")
+                gui.request_quit()
+            elif lookup_fn and query.lower().startswith("seen "):
+                lookup_fn(query[5:].strip())
+            elif query:
+                search_fn(query)
+            else:
+                gui.append_text("❌ Search query cannot be empty!\n")
+    
+    search_thread = threading.Thread(target=run_search_loop, daemon=True)
+    search_thread.start()
+    
+    root.mainloop()
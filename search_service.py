@@ -0,0 +1,350 @@
+import asyncio
+import hmac
+import ipaddress
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from metrics import metrics  # Request counters and timings
+
+# Where the service listens by default
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Searches, saves and sends running at the same time
+DEFAULT_WORKERS = 8
+# Longest a request may take before the client gets a 504
+REQUEST_TIMEOUT_SECONDS = 60
+# Largest request body accepted
+MAX_BODY_BYTES = 1024 * 1024
+# Most matches /saved?q= returns at once
+MAX_LOOKUP_LIMIT = 100
+# Most results one search may ask Tavily for
+MAX_SEARCH_RESULTS = 20
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+                503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    """Raised by a handler to answer with an error status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SearchService:
+    """
+    A small JSON-over-HTTP service so many people can search, save and send
+    through one running process.
+
+    The asyncio loop only reads requests and writes responses; the blocking
+    work (Tavily calls, rendering, saving, SMTP) runs on a bounded thread
+    pool. Every request shares the process-wide search cache, Tavily client,
+    SMTP pool, outbox and indexes from TavilySSS. When every worker is busy
+    and `max_pending` requests are already waiting, new ones get a 503
+    instead of piling up.
+
+    When a token is set, every request except /health must carry it as
+    `Authorization: Bearer <token>` (or an `X-Service-Token` header),
+    otherwise anyone who can reach the port could send mail from the
+    configured account.
+
+    Endpoints:
+        GET  /health              status, worker usage and counters
+        POST /search              {"query", "max_results", "save", "refresh"} -> results
+        GET  /saved?q=words       saved results matching the words (or a URL)
+        GET  /saved/<save id>     one saved result with its HTML body
+        POST /send                {"to", "subject", "body", "request_id"} -> queued/sent
+
+    Args:
+        workers (int): Size of the thread pool
+        timeout (float): Seconds before a request is answered with 504
+        max_pending (int): Requests allowed to wait for a worker (defaults to 4 per worker)
+        token (str): Shared secret clients must send (None = no check, for localhost only)
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=REQUEST_TIMEOUT_SECONDS, max_pending=None, token=None):
+        self.workers = max(1, workers)
+        self.token = token or None
+        self.timeout = timeout
+        self.max_pending = self.workers * 4 if max_pending is None else max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="service")
+        self._lock = threading.Lock()
+        # Jobs handed to the pool that haven't finished (timed-out ones still count until they end)
+        self._active = 0
+        self._routes = {
+            ('GET', '/health'): self.handle_health,
+            ('POST', '/search'): self.handle_search,
+            ('GET', '/saved'): self.handle_lookup,
+            ('POST', '/send'): self.handle_send,
+        }
+
+    # --- Running blocking work on the pool ---
+
+    def _job_done(self, _future):
+        with self._lock:
+            self._active -= 1
+
+    async def run_blocking(self, fn, *args):
+        """Run `fn(*args)` on the worker pool, with the request timeout and the queue limit."""
+        with self._lock:
+            if self._active >= self.workers + self.max_pending:
+                metrics.inc('service_rejected')
+                raise HTTPError(503, "Too many requests in progress, try again shortly")
+            self._active += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._job_done)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.inc('service_timeouts')
+            raise HTTPError(504, f"Request took longer than {self.timeout:g} seconds")
+
+    # --- Handlers (each returns a JSON-serialisable object) ---
+
+    async def handle_health(self, params, body):
+        with self._lock:
+            active = self._active
+        return {'status': 'ok', 'workers': self.workers, 'active': active,
+                'counters': metrics.snapshot()['counters']}
+
+    async def handle_search(self, params, body):
+        query = str(body.get('query', '')).strip()
+        if not query:
+            raise HTTPError(400, "'query' is required")
+        try:
+            max_results = int(body.get('max_results', 5))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "'max_results' must be a number")
+        if not 1 <= max_results <= MAX_SEARCH_RESULTS:
+            raise HTTPError(400, f"'max_results' must be between 1 and {MAX_SEARCH_RESULTS}")
+        return await self.run_blocking(_search, query, max_results,
+                                       bool(body.get('save')), bool(body.get('refresh')))
+
+    async def handle_lookup(self, params, body):
+        text = params.get('q', [''])[0].strip()
+        if not text:
+            raise HTTPError(400, "add ?q=words (or a URL) to look through saved results")
+        try:
+            limit = int(params.get('limit', ['10'])[0])
+        except ValueError:
+            raise HTTPError(400, "'limit' must be a number")
+        if not 1 <= limit <= MAX_LOOKUP_LIMIT:
+            raise HTTPError(400, f"'limit' must be between 1 and {MAX_LOOKUP_LIMIT}")
+        return {'matches': await self.run_blocking(_lookup, text, limit)}
+
+    async def handle_saved(self, save_id):
+        saved = await self.run_blocking(_saved, save_id)
+        if saved is None:
+            raise HTTPError(404, f"No saved result called '{save_id}'")
+        return saved
+
+    async def handle_send(self, params, body):
+        missing = [k for k in ('to', 'body') if not body.get(k)]
+        if missing:
+            raise HTTPError(400, f"missing {', '.join(missing)}")
+        # A client retrying after a timeout sends the same request_id so the email goes out once
+        return await self.run_blocking(_send, str(body['to']), str(body.get('subject') or "Search Result"),
+                                       str(body['body']), body.get('request_id'))
+
+    def authorized(self, headers):
+        """True if the request carries the service token (or no token is configured)."""
+        if self.token is None:
+            return True
+        auth = headers.get('authorization', '')
+        sent = auth[len('bearer '):].strip() if auth.lower().startswith('bearer ') else headers.get('x-service-token', '')
+        return hmac.compare_digest(sent.encode('utf-8'), self.token.encode('utf-8'))
+
+    async def dispatch(self, method, target, body_bytes, headers=None):
+        """Route one request and return (status, JSON-serialisable object)."""
+        parts = urlsplit(target)
+        params = parse_qs(parts.query)
+        path = parts.path.rstrip('/') or '/'
+        if path != '/health' and not self.authorized(headers or {}):
+            metrics.inc('service_unauthorized')
+            return 401, {'error': "Missing or wrong service token"}
+        try:
+            body = json.loads(body_bytes) if body_bytes else {}
+            if not isinstance(body, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            return 400, {'error': f"Invalid JSON body: {e}"}
+        try:
+            if path.startswith('/saved/') and method == 'GET':
+                return 200, await self.handle_saved(path[len('/saved/'):])
+            handler = self._routes.get((method, path))
+            if handler is None:
+                if any(route_path == path for _, route_path in self._routes):
+                    raise HTTPError(405, f"{method} is not allowed on {path}")
+                raise HTTPError(404, f"No endpoint at {path}")
+            return 200, await handler(params, body)
+        except HTTPError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            metrics.inc('service_errors')
+            return 500, {'error': str(e)}
+
+    # --- HTTP on top of asyncio streams ---
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it (keep-alive supported)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    return
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, close=True)
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, close=True)
+                    return
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "Request body too large"}, close=True)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                close = (headers.get('connection', '').lower() == 'close'
+                         or (version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive'))
+
+                metrics.inc('service_requests')
+                with metrics.timer('service_request'):
+                    status, payload = await self.dispatch(method.upper(), target, body, headers)
+                await self._respond(writer, status, payload, close=close)
+                if close:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, close=False):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Listen until cancelled. `ready` (an asyncio.Event) is set once the socket is open."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"🛰️ Search service listening on {addresses} with {self.workers} workers")
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- The blocking work, run on the pool (wraps the same functions the window uses) ---
+
+def _search(query, max_results, save, refresh):
+    from TavilySSS import dedupe_results, save_to_html, tavily_search
+    try:
+        response = tavily_search(query, max_results=max_results, refresh=refresh)
+    except Exception as e:
+        metrics.inc('search_errors')
+        raise HTTPError(502, f"Error in search: {e}")
+    results = dedupe_results(response.get('results', []))
+    out = []
+    for result in results:
+        content = result.get('raw_content', '') or result.get('content', '')
+        entry = {key: result.get(key) for key in ('title', 'url', 'score', 'content')}
+        entry['raw_content'] = content
+        for key in ('alternate_urls', 'duplicate_of'):
+            if result.get(key):
+                entry[key] = result[key]
+        if save and not result.get('duplicate_of'):
+            entry['saved_id'] = save_to_html(content, result['title'], result['url'], open_browser=False,
+                                             query=query)
+        out.append(entry)
+    return {'query': query, 'results': out}
+
+
+def _save_id(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _lookup(text, limit):
+    from TavilySSS import get_result_index
+    index = get_result_index()
+    matches = index.find_url(text) if text.startswith(('http://', 'https://')) else index.search(text, limit=limit)
+    for match in matches:
+        match['saved_id'] = _save_id(match['path'])
+    return matches
+
+
+def _saved(save_id):
+    from TavilySSS import get_result_store
+    store = get_result_store()
+    record = store.find(save_id)
+    if record is None:
+        return None
+    return dict(record, html=store.get_body(record['key']))
+
+
+def _send(to, subject, body, request_id=None):
+    from TavilySSS import EMAIL_OUTBOX, build_email, deliver_email, get_outbox, start_outbox_workers
+    msg = build_email(subject, body, to)
+    if EMAIL_OUTBOX:
+        message_id, added = get_outbox().enqueue(msg, request_key=request_id)
+        start_outbox_workers()
+        return {'status': 'queued' if added else 'already queued', 'id': message_id}
+    try:
+        deliver_email(msg)
+    except Exception as e:
+        metrics.inc('smtp_errors')
+        raise HTTPError(502, f"Could not send the email: {e}")
+    return {'status': 'sent'}
+
+
+def is_loopback(host):
+    """True if `host` only accepts connections from this machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def run_service(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, timeout=REQUEST_TIMEOUT_SECONDS,
+                token=None):
+    """
+    Run the service until Ctrl+C. Returns 0, or 1 if it refused to start.
+
+    Listening on anything but localhost needs a token: the service can send
+    mail from the configured account, so it must not be open to everyone.
+    """
+    if not token and not is_loopback(host):
+        print(f"❌ Refusing to listen on {host} without a token. Set SERVICE_TOKEN in the .env file "
+              f"(clients send it as 'Authorization: Bearer <token>'), or use --host 127.0.0.1.")
+        return 1
+    service = SearchService(workers=workers, timeout=timeout, token=token)
+    try:
+        asyncio.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        print("\n👋 Search service stopped.")
+    return 0
@@ -0,0 +1,165 @@
+import smtplib   # For talking to the SMTP server
+import ssl       # For a secure email connection
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import metrics  # SMTP connect/login/send timings
+
+
+class SMTPPool:
+    """
+    A small pool of logged-in SMTP connections that get reused between emails.
+
+    Opening a connection to Gmail means a TLS handshake plus a login, which is
+    most of the time spent sending a single message. The pool keeps finished
+    connections around, checks them with NOOP before handing them out again,
+    and throws away any that have gone stale or sat idle for too long.
+
+    Args:
+        host (str): SMTP server host name
+        port (int): SMTP server port
+        username (str): Account to log in with (None skips login)
+        password (str): Password / app password for the account
+        use_ssl (bool): Connect with SMTP_SSL (True) or plain SMTP (False).
+            Plain SMTP is handy for pointing the pool at a local test server.
+        max_size (int): Most connections that may be open at the same time
+        max_idle (float): Seconds an unused connection is kept before closing
+        timeout (float): Socket timeout for each connection
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True,
+                 max_size=2, max_idle=240, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+
+        # Idle connections as (connection, time it was last used) pairs
+        self._idle = []
+        self._lock = threading.Lock()
+        # Limits how many connections can be checked out at once
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self):
+        """Open a brand new connection and log in."""
+        with metrics.timer('smtp_connect'):
+            if self.use_ssl:
+                context = ssl.create_default_context()
+                conn = smtplib.SMTP_SSL(self.host, self.port, context=context, timeout=self.timeout)
+            else:
+                conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.username:
+                with metrics.timer('smtp_login'):
+                    conn.login(self.username, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        metrics.inc('smtp_connections_opened')
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        """Close a connection, ignoring errors from an already dead socket."""
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(conn):
+        """Ask the server for a NOOP to make sure the connection still works."""
+        try:
+            status = conn.noop()[0]
+        except Exception:
+            return False
+        return status == 250
+
+    def acquire(self):
+        """
+        Get a working connection, reusing an idle one when possible.
+        Blocks while max_size connections are already checked out.
+        """
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    # Newest first: it is the one most likely to still be open
+                    conn, last_used = self._idle.pop()
+                if time.monotonic() - last_used > self.max_idle:
+                    self._close(conn)
+                elif self._is_alive(conn):
+                    metrics.inc('smtp_connections_reused')
+                    return conn
+                else:
+                    self._close(conn)
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """
+        Give a connection back to the pool.
+        Pass discard=True when the connection hit an error and should be closed.
+        """
+        try:
+            if discard:
+                self._close(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager version of acquire()/release()."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        """
+        Send an EmailMessage over a pooled connection.
+        If the server dropped the connection mid-send we reconnect and try once more.
+        """
+        try:
+            with self.connection() as conn, metrics.timer('smtp_send'):
+                return conn.send_message(msg, from_addr=from_addr, to_addrs=to_addrs)
+        except smtplib.SMTPServerDisconnected:
+            metrics.inc('smtp_reconnects')
+            with self.connection() as conn, metrics.timer('smtp_send'):
+                return conn.send_message(msg, from_addr=from_addr, to_addrs=to_addrs)
+
+    def prune(self):
+        """Close idle connections that have been unused for longer than max_idle."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [conn for conn, last_used in self._idle if now - last_used > self.max_idle]
+            self._idle = [(conn, last_used) for conn, last_used in self._idle
+                          if now - last_used <= self.max_idle]
+        for conn in stale:
+            self._close(conn)
+
+    def close(self):
+        """Close every idle connection (used at program exit)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
@@ -0,0 +1,115 @@
+import codecs
+import mmap
+import os
+import tempfile
+
+# Page bodies longer than this (in characters) are moved out of memory into a temp file
+SPILL_THRESHOLD_CHARS = 1024 * 1024
+# How much text is handed out at a time when a spilled body is read back
+CHUNK_CHARS = 256 * 1024
+
+
+class SpilledText:
+    """
+    A large piece of text kept in a temporary file instead of in memory.
+
+    The text is read back through mmap, a chunk at a time, so a huge page
+    body never has to be held as one Python string. The temp file is deleted
+    by close() (or when the object is garbage collected).
+
+    Args:
+        text (str or iterable of str): The text to move to disk
+        directory (str): Where to create the temp file (the system default if None)
+    """
+
+    def __init__(self, text, directory=None):
+        fd, self.path = tempfile.mkstemp(prefix="tavilysss-", suffix=".txt", dir=directory)
+        self._length = 0
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            for chunk in ([text] if isinstance(text, str) else text):
+                f.write(chunk)
+                self._length += len(chunk)
+        self.size = os.path.getsize(self.path)
+
+    def __len__(self):
+        """Length in characters, like len() of the original string."""
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def chunks(self, chunk_chars=CHUNK_CHARS):
+        """Yield the text in pieces of about `chunk_chars` characters."""
+        if not self.size:
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # An incremental decoder copes with characters split across chunk boundaries
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            for start in range(0, self.size, chunk_chars):
+                text = decoder.decode(mapped[start:start + chunk_chars], final=start + chunk_chars >= self.size)
+                if text:
+                    yield text
+
+    def head(self, chars):
+        """Return the first `chars` characters as a string."""
+        parts = []
+        remaining = chars
+        for chunk in self.chunks(min(chars, CHUNK_CHARS) or 1):
+            parts.append(chunk[:remaining])
+            remaining -= len(parts[-1])
+            if remaining <= 0:
+                break
+        return "".join(parts)
+
+    def read(self):
+        """Return the whole text as one string (only when it really has to be in memory)."""
+        return "".join(self.chunks())
+
+    def __str__(self):
+        return self.read()
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def iter_text(content, chunk_chars=CHUNK_CHARS):
+    """Yield a string or SpilledText in chunks."""
+    if isinstance(content, SpilledText):
+        yield from content.chunks(chunk_chars)
+    else:
+        for start in range(0, len(content or ""), chunk_chars):
+            yield content[start:start + chunk_chars]
+
+
+def stream_results(results, threshold=None):
+    """
+    Yield search results one at a time, moving bodies longer than `threshold`
+    characters (SPILL_THRESHOLD_CHARS by default) into SpilledText files.
+
+    Each entry of `results` is cleared as it is handed out, so once the caller
+    is done with a result nothing else keeps its body in memory.
+    """
+    if threshold is None:
+        threshold = SPILL_THRESHOLD_CHARS
+    for i in range(len(results)):
+        result = results[i]
+        results[i] = None
+        raw = result.get('raw_content')
+        if isinstance(raw, str) and len(raw) > threshold:
+            result = dict(result, raw_content=SpilledText(raw))
+            del raw
+        yield result
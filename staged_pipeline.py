@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+
+from metrics import metrics  # Per-stage timings
+
+# Marks the end of the input; each worker passes it on once the stage is done
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a StagedPipeline: a pool of worker threads reading from a
+    bounded input queue.
+
+    `fn(item)` returns the items for the next stage: a list (fan-out), a
+    single item, or None to drop it. When the next stage's queue is full the
+    workers wait, which pushes back all the way to the input instead of
+    piling up work in memory.
+
+    Args:
+        name (str): Shown in reports and used for metric names
+        fn (callable): Does the work for one item
+        workers (int): Threads running `fn`
+        queue_size (int): Most items waiting in front of this stage
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=8):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.next_stage = None
+        self._lock = threading.Lock()
+        self._threads = []
+        self._finished_workers = 0
+        # Statistics for the occupancy report
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0       # Time spent inside fn, summed over workers
+        self.blocked_seconds = 0.0    # Time spent waiting for room in the next stage's queue
+        self.depth_samples = 0
+        self.depth_total = 0
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _forward(self, item):
+        if self.next_stage is None:
+            return
+        start = time.perf_counter()
+        self.next_stage.queue.put(item)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.blocked_seconds += waited
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                # Let the other workers of this stage see the end too; the last one tells the next stage
+                self.queue.put(_DONE)
+                with self._lock:
+                    self._finished_workers += 1
+                    last = self._finished_workers == self.workers
+                if last and self.next_stage is not None:
+                    self.next_stage.queue.put(_DONE)
+                return
+            start = time.perf_counter()
+            try:
+                with metrics.timer(f'stage_{self.name}'):
+                    output = self.fn(item)
+            except Exception as e:
+                output = None
+                # metrics.timer has already counted it as stage_<name>_errors
+                with self._lock:
+                    self.errors += 1
+                print(f"❌ {self.name} failed: {e}")
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - start
+                self.processed += 1
+            if output is None:
+                continue
+            for out in (output if isinstance(output, list) else [output]):
+                self._forward(out)
+
+    def sample(self):
+        """Record the current queue length (called periodically by the pipeline)."""
+        with self._lock:
+            self.depth_samples += 1
+            self.depth_total += self.queue.qsize()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages, each with its own workers and a
+    bounded queue in front, so network-bound stages (Tavily, SMTP) overlap
+    with rendering and disk writes instead of waiting for each other.
+
+    report() shows each stage's occupancy (the share of its workers' time
+    spent working), average queue length and time blocked on the next stage:
+    the bottleneck is the stage that is busy nearly all the time while the
+    stages before it are blocked.
+
+    Args:
+        stages (list): Stage objects, in order
+        sample_interval (float): Seconds between queue-length samples
+    """
+
+    def __init__(self, stages, sample_interval=0.1):
+        self.stages = stages
+        self.sample_interval = sample_interval
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+        self._started = None
+        self._finished = None
+        self._sampler = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+        self._sampler = threading.Thread(target=self._sample, name="pipeline-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def _sample(self):
+        while self._finished is None:
+            for stage in self.stages:
+                stage.sample()
+            time.sleep(self.sample_interval)
+
+    def submit(self, item):
+        """Feed one item to the first stage (waits while its queue is full)."""
+        self.stages[0].queue.put(item)
+
+    def finish(self, timeout=None):
+        """Signal the end of the input and wait until every stage has drained."""
+        self.stages[0].queue.put(_DONE)
+        for stage in self.stages:
+            stage.join(timeout)
+        self._finished = time.perf_counter()
+
+    def elapsed(self):
+        end = self._finished or time.perf_counter()
+        return end - self._started if self._started else 0.0
+
+    def stats(self):
+        """Return one dict of statistics per stage."""
+        elapsed = self.elapsed() or 1e-9
+        rows = []
+        for stage in self.stages:
+            rows.append({
+                'stage': stage.name,
+                'workers': stage.workers,
+                'processed': stage.processed,
+                'errors': stage.errors,
+                'occupancy': min(1.0, stage.busy_seconds / (stage.workers * elapsed)),
+                'avg_queue': stage.depth_total / stage.depth_samples if stage.depth_samples else 0.0,
+                'queue_size': stage.queue.maxsize,
+                'blocked_seconds': stage.blocked_seconds,
+            })
+        return rows
+
+    def report(self):
+        """Print the per-stage statistics and name the likely bottleneck."""
+        rows = self.stats()
+        print(f"\n{'='*70}")
+        print(f"🏭 Pipeline finished in {self.elapsed():.2f}s")
+        print(f"{'='*70}")
+        print(f"{'stage':<10}{'workers':>8}{'items':>8}{'errors':>8}{'busy':>8}{'avg queue':>12}{'blocked':>10}")
+        for row in rows:
+            print(f"{row['stage']:<10}{row['workers']:>8}{row['processed']:>8}{row['errors']:>8}"
+                  f"{row['occupancy']:>8.0%}{row['avg_queue']:>7.1f}/{row['queue_size']:<4}"
+                  f"{row['blocked_seconds']:>9.1f}s")
+        if rows:
+            busiest = max(rows, key=lambda r: r['occupancy'])
+            print(f"\n🐢 Busiest stage: {busiest['stage']} ({busiest['occupancy']:.0%} busy) - "
+                  f"it is the bottleneck if the stages before it show blocked time.")
+        return rows
@@ -0,0 +1,92 @@
+import hashlib
+import re
+from collections import Counter
+
+# Words used for fingerprints: runs of letters/digits, lowercased
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so formatting-only edits don't change the hash."""
+    return " ".join((text or "").lower().split())
+
+
+def content_hash(text):
+    """SHA-256 of the normalized text: equal only when the words are exactly the same."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def words(text):
+    """Lowercased words of the text, in order."""
+    return _WORD_RE.findall((text or "").lower())
+
+
+def _hash64(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text, bits=64):
+    """
+    64-bit SimHash of the text's words (weighted by how often they appear).
+    Pages that differ only a little get fingerprints a few bits apart.
+    """
+    totals = [0] * bits
+    for token, weight in Counter(words(text)).items():
+        h = _hash64(token)
+        for bit in range(bits):
+            if h >> bit & 1:
+                totals[bit] += weight
+            else:
+                totals[bit] -= weight
+    fingerprint = 0
+    for bit in range(bits):
+        if totals[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    """Number of bits that differ between two fingerprints."""
+    return bin(a ^ b).count("1")
+
+
+# MinHash signature size and the value used for a bin no shingle landed in
+MINHASH_BINS = 64
+EMPTY_BIN = (1 << 64) - 1
+
+
+def shingles(text, size=4):
+    """Overlapping runs of `size` words (a page with fewer words is one shingle)."""
+    tokens = words(text)
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(text, bins=MINHASH_BINS, shingle_size=4):
+    """
+    MinHash signature of the text's word shingles, using one-permutation hashing:
+    every shingle is hashed once, the hash picks a bin, and each bin keeps its
+    smallest value. Linear in the length of the text.
+    Returns a tuple of `bins` integers.
+    """
+    signature = [EMPTY_BIN] * bins
+    for shingle in shingles(text, shingle_size):
+        h = _hash64(shingle)
+        b = h % bins
+        if h < signature[b]:
+            signature[b] = h
+    return tuple(signature)
+
+
+def minhash_similarity(a, b):
+    """Estimated Jaccard similarity of two MinHash signatures (0.0 to 1.0)."""
+    used = 0
+    same = 0
+    for x, y in zip(a, b):
+        if x == EMPTY_BIN and y == EMPTY_BIN:
+            continue
+        used += 1
+        if x == y:
+            same += 1
+    return same / used if used else 0.0
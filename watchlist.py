@@ -0,0 +1,205 @@
+import sqlite3
+import threading
+import time
+
+from text_fingerprint import content_hash, hamming_distance, simhash
+
+# Pages whose SimHash moved by at most this many bits count as unchanged
+# (small edits move it 0-3 bits; rewriting a tenth or more of a page usually moves it further)
+CHANGE_THRESHOLD_BITS = 4
+
+
+class Watchlist:
+    """
+    Saved searches that run on an interval, plus a fingerprint of every page
+    each one has already reported.
+
+    Stored in a SQLite file. A result is reported when its URL is new for
+    that query, or when its content changed materially (the exact hash
+    differs and the SimHash moved by more than CHANGE_THRESHOLD_BITS).
+
+    Args:
+        path (str): Location of the SQLite database file
+        change_threshold (int): SimHash bits that must differ to count as changed
+    """
+
+    def __init__(self, path, change_threshold=CHANGE_THRESHOLD_BITS):
+        self.path = path
+        self.change_threshold = change_threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS watches (
+                query TEXT PRIMARY KEY,
+                recipients TEXT NOT NULL DEFAULT '',
+                interval_seconds REAL NOT NULL,
+                max_results INTEGER NOT NULL DEFAULT 5,
+                last_run REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                query TEXT NOT NULL,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                simhash TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_reported REAL NOT NULL,
+                PRIMARY KEY (query, url)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def add(self, query, interval_seconds, recipients=(), max_results=5):
+        """Add a saved search (or update its settings)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watches (query, recipients, interval_seconds, max_results) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(query) DO UPDATE SET recipients = excluded.recipients, "
+                "interval_seconds = excluded.interval_seconds, max_results = excluded.max_results",
+                (query, ",".join(recipients), interval_seconds, max_results),
+            )
+            self._conn.commit()
+
+    def remove(self, query):
+        """Delete a saved search and its fingerprints. Returns True if it existed."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM watches WHERE query = ?", (query,))
+            self._conn.execute("DELETE FROM fingerprints WHERE query = ?", (query,))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def watches(self):
+        """Return every saved search as a dict."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, recipients, interval_seconds, max_results, last_run FROM watches ORDER BY query"
+            ).fetchall()
+        return [{'query': q, 'recipients': [r for r in recipients.split(",") if r],
+                 'interval_seconds': interval, 'max_results': max_results, 'last_run': last_run}
+                for q, recipients, interval, max_results, last_run in rows]
+
+    def due(self, now=None):
+        """Return the saved searches whose interval has passed."""
+        now = now or time.time()
+        return [w for w in self.watches() if now - w['last_run'] >= w['interval_seconds']]
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next saved search is due (None if there are none)."""
+        now = now or time.time()
+        waits = [w['last_run'] + w['interval_seconds'] - now for w in self.watches()]
+        return max(0.0, min(waits)) if waits else None
+
+    def mark_run(self, query, when=None):
+        with self._lock:
+            self._conn.execute("UPDATE watches SET last_run = ? WHERE query = ?", (when or time.time(), query))
+            self._conn.commit()
+
+    def check(self, query, url, content):
+        """
+        Compare a result with what was last reported for this query.
+        Returns (change, fingerprint): change is 'new', 'changed' or 'same', and
+        the fingerprint is what to pass to record() once the change has been
+        saved and sent. Until then nothing is stored, so a report that fails
+        is found again on the next run.
+        """
+        exact = content_hash(content)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, simhash FROM fingerprints WHERE query = ? AND url = ?", (query, url)
+            ).fetchone()
+        if row is not None and row[0] == exact:
+            return 'same', None
+        fingerprint = simhash(content)
+        if row is not None and hamming_distance(int(row[1], 16), fingerprint) <= self.change_threshold:
+            return 'same', None
+        return ('new' if row is None else 'changed'), (exact, fingerprint)
+
+    def record(self, query, url, fingerprint):
+        """
+        Remember a reported result's fingerprint (from check()). It only moves
+        forward when a change is reported, so slow drift still adds up.
+        """
+        exact, fingerprint = fingerprint
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO fingerprints (query, url, content_hash, simhash, first_seen, last_reported) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(query, url) DO UPDATE SET "
+                "content_hash = excluded.content_hash, simhash = excluded.simhash, "
+                "last_reported = excluded.last_reported",
+                (query, url, exact, f"{fingerprint:016x}", now, now),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def run_watch(watchlist, watch, save=True):
+    """
+    Run one saved search and save/email only the results that are new or changed.
+
+    A result is remembered as reported once it was emailed, or, for a watch
+    without recipients, once it was saved; otherwise it comes up again on the
+    next run. "Emailed" means handed to the outbox when EMAIL_OUTBOX is on
+    (the outbox retries it and keeps it as a dead letter if it never goes
+    out) and actually sent when it is off.
+    Returns the list of reported results (each with a 'change' key).
+    """
+    from TavilySSS import tavily_search, save_to_html, send_digest, render_markdown
+    query = watch['query']
+    print(f"\n👀 Checking '{query}'...")
+    try:
+        # Always ask Tavily: a cached response would hide changes
+        response = tavily_search(query, max_results=watch['max_results'], refresh=True)
+    except Exception as e:
+        print(f"❌ Error in search: {str(e)}")
+        return []
+    finally:
+        watchlist.mark_run(query)
+
+    changes = []
+    fingerprints = {}   # url -> fingerprint, for the changes found this run
+    saved = set()       # urls saved this run
+    for result in response.get('results', []):
+        content = result.get('raw_content', '') or result.get('content', '')
+        change, fingerprint = watchlist.check(query, result['url'], content)
+        if change == 'same':
+            continue
+        changes.append(dict(result, query=query, change=change))
+        fingerprints[result['url']] = fingerprint
+        if not save or save_to_html(content, f"[{change}] {result['title']}", result['url'],
+                                    body_fragment=render_markdown(content), open_browser=False, query=query):
+            saved.add(result['url'])
+
+    unchanged = len(response.get('results', [])) - len(changes)
+    print(f"   {len(changes)} new or changed, {unchanged} unchanged")
+    if changes and watch['recipients']:
+        sent, failed = send_digest(changes, watch['recipients'],
+                                   f"Watchlist update: {query} ({len(changes)} new/changed)")
+        if failed:
+            print(f"⚠️ The digest for '{query}' was not sent; these changes will be reported again next run.")
+            return changes
+        # Everything in the digest went out, saved or not, so none of it is emailed twice
+        reported = fingerprints
+    else:
+        reported = {url: fp for url, fp in fingerprints.items() if url in saved}
+    for url, fingerprint in reported.items():
+        watchlist.record(query, url, fingerprint)
+    return changes
+
+
+def run_watchlist(watchlist, once=False, save=True, max_sleep=60):
+    """
+    Run every due saved search, then keep going as each one comes due again.
+    With `once=True`, run whatever is due right now and return.
+    """
+    while True:
+        for watch in watchlist.due():
+            run_watch(watchlist, watch, save=save)
+        if once:
+            return
+        wait = watchlist.seconds_until_next()
+        time.sleep(max_sleep if wait is None else min(max(wait, 1), max_sleep))